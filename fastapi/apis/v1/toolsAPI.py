@@ -1,14 +1,25 @@
 from fastapi import APIRouter, Request
 from auth import validateToken
 from tools.deepReadURL.models import DeepResponse, DeepReadURL
-from tools.deepReadURL.generateMarkdown import deepSearchForPage
-from tools.readURL.generateMarkdown import generateMarkdownForPage
+from tools.deepReadURL.generateMarkdown import (
+    deepSearchForPage,
+    streamDeepSearchForPage,
+)
+from tools.readURL.generateMarkdown import (
+    generateMarkdownForPage,
+    streamMarkdownForPage,
+)
 from tools.readURL.models import ReadURL
-from tools.searchWeb.models import SearchParams, SearchResponse
-from tools.searchWeb.searchWeb import search
+from tools.searchWeb.models import (
+    SearchParams,
+    SearchResponse,
+    SearchBatchParams,
+    SearchBatchResponse,
+)
+from tools.searchWeb.searchWeb import search, searchBatch, streamSearch
 from tools.readURL.models import ContentURL
 from tools.youtube.models import Transcription, TranscriptionResponse
-from tools.youtube.getTranscript import getTranscription
+from tools.youtube.getTranscript import getTranscription, streamTranscription
 from tools.mermaid.models import Mermaid
 from tools.mermaid.createImage import createMermaidDiagram
 from tools.plantuml.models import PlantUML
@@ -25,6 +36,12 @@ from tools.graphviz.createImage import createGraphViz
 from tools.quickchart.createImage import createQuickCharts
 from tools.quickchart.models import QuickChartRequest
 from tools.threadingUtils import run_in_threadpool
+from tools.readURL.cache import pageCache
+from tools.llmCache import llmCache
+from tools.searchWeb.cache import serpCache
+from tools.scheduler import scheduler
+from tools.rateLimiter import limiterStats
+from tools.streaming import streamingResponse
 
 toolsRouter = APIRouter(prefix="/tool")
 
@@ -34,13 +51,16 @@ toolsRouter = APIRouter(prefix="/tool")
 async def getTranscript(data: Transcription, request: Request) -> TranscriptionResponse:
     """Get Youtube Transcription
     This function takes in the URL for a YouTube video and the language code for transcription and returns it's transcription with start time and duration in seconds
+    use stream ("ndjson" | "sse"): Send each transcript as soon as it is ready, with summary tokens as they are written.
     """
     if not validateToken(request.headers["Authorization"]):
         raise Exception("Invalid Token")
 
     print(f"URL: {data.urls}\nFetching transcription")
 
-    transcript = await run_in_threadpool(getTranscription, data)
+    if data.stream:
+        return streamingResponse(streamTranscription(data), data.stream)
+    transcript = await getTranscription(data)
     return transcript
 
 
@@ -56,7 +76,7 @@ async def createMermaid(data: Mermaid, request: Request) -> CommandResponse:
 
     print(f"Mermaid Diagram Recieved : {data.mermaidText}")
 
-    return await run_in_threadpool(createMermaidDiagram, data.mermaidText)
+    return await createMermaidDiagram(data.mermaidText)
 
 
 # Create a Plantuml Diagram from text
@@ -71,7 +91,7 @@ async def createPlantuml(data: PlantUML, request: Request) -> CommandResponse:
 
     print(f"Plantuml Diagram Recieved : {data.plantumlText}")
 
-    return await run_in_threadpool(createPlantUML, data.plantumlText)
+    return await createPlantUML(data.plantumlText)
 
 
 # Create a Matplotlib Diagram from text
@@ -124,7 +144,7 @@ async def createWordcloud(data: WordCloudRequest, request: Request) -> CommandRe
 
     print(f"Wordcloud request received:\n{data.text}")
 
-    return await run_in_threadpool(createWordCloud, create_word_cloud(data))
+    return await createWordCloud(create_word_cloud(data))
 
 
 @toolsRouter.post("/createApexcharts")
@@ -139,7 +159,7 @@ async def createApexcharts(data: ApexChartRequest, request: Request) -> CommandR
 
     print(f"Apexcharts request received:\n{data.config}")
 
-    return await run_in_threadpool(createApexCharts, data)
+    return await createApexCharts(data)
 
 
 @toolsRouter.post("/createGraphviz")
@@ -153,7 +173,7 @@ async def createGraphviz(data: GraphvizRequest, request: Request) -> CommandResp
 
     print(f"Graphviz request received:\n{data.graph}")
 
-    return await run_in_threadpool(createGraphViz, data)
+    return await createGraphViz(data)
 
 
 @toolsRouter.post("/createQuickChart")
@@ -170,7 +190,7 @@ async def createQuickChart(
 
     print(f"QuickChart request received:\n{data.chart}")
 
-    return await run_in_threadpool(createQuickCharts, data)
+    return await createQuickCharts(data)
 
 
 @toolsRouter.post("/readWebpage")
@@ -179,6 +199,7 @@ async def readWebPage(data: ReadURL, request: Request) -> ContentURL:
     Read Webpages
     This function allows to convert a webpage to Markdown by sharing it's URL
     use summarize (bool): Whether to summarize the content of the search results.
+    use stream ("ndjson" | "sse"): Send each page as soon as it is read, with summary tokens as they are written, followed by a summary record.
     """
     token = request.headers["Authorization"]
     if not validateToken(token):
@@ -186,15 +207,18 @@ async def readWebPage(data: ReadURL, request: Request) -> ContentURL:
 
     print(f"readWebpage request received:\n{data.urls}")
 
-    return await run_in_threadpool(generateMarkdownForPage, data)
+    if data.stream:
+        return streamingResponse(streamMarkdownForPage(data), data.stream)
+    return await generateMarkdownForPage(data)
 
 
 @toolsRouter.post("/deepReadWebpage")
-def deepReadWebPage(data: DeepReadURL, request: Request) -> DeepResponse:
+async def deepReadWebPage(data: DeepReadURL, request: Request) -> DeepResponse:
     """
     Deep Read Webpages
     This function allows you to navigate to the links within the input webpage and return information from all the links found + the original webpage.
     use summarize (bool): Whether to summarize the content of the search results.
+    use stream ("ndjson" | "sse"): Send each page as soon as it is read, followed by a summary record.
     """
     token = request.headers["Authorization"]
     if not validateToken(token):
@@ -202,7 +226,9 @@ def deepReadWebPage(data: DeepReadURL, request: Request) -> DeepResponse:
 
     print(f"deepReadWebpage request received:\n{data.url}")
 
-    return deepSearchForPage(data)
+    if data.stream:
+        return streamingResponse(streamDeepSearchForPage(data), data.stream)
+    return await deepSearchForPage(data)
 
 
 @toolsRouter.post("/searchWeb")
@@ -212,6 +238,7 @@ async def searchWeb(data: SearchParams, request: Request) -> SearchResponse:
     SearchParams: The search parameters including query, engines etc.
     crawl (bool): fetch content of search results
     summarize (bool): summarize content of search results
+    stream ("ndjson" | "sse"): send the ranked results first, then the content of each result as soon as it is ready, with summary tokens as they are written
     """
     token = request.headers["Authorization"]
     if not validateToken(token):
@@ -219,4 +246,47 @@ async def searchWeb(data: SearchParams, request: Request) -> SearchResponse:
 
     print(f"searchWeb request received:\n{data.query}")
 
-    return await run_in_threadpool(search, data)
+    if data.stream:
+        return streamingResponse(streamSearch(data), data.stream)
+    return await search(data)
+
+
+@toolsRouter.post("/searchWebBatch")
+async def searchWebBatch(
+    data: SearchBatchParams, request: Request
+) -> SearchBatchResponse:
+    """
+    Run several web searches at once.
+    searches: list of SearchParams, as for searchWeb; stream is not supported here
+    Pages returned by several searches are crawled and summarized once, for all of their queries.
+    """
+    token = request.headers["Authorization"]
+    if not validateToken(token):
+        raise Exception("Invalid Token")
+
+    print(
+        "searchWebBatch request received:\n"
+        + "\n".join(params.query for params in data.searches)
+    )
+
+    return await searchBatch(data)
+
+
+@toolsRouter.get("/cacheStats")
+async def cacheStats(request: Request) -> dict:
+    """
+    Cache Statistics
+    This function returns the size and hit/miss/revalidation counters of the server side caches,
+    the current load of the crawl scheduler and the state of the per-model OpenAI rate limiters.
+    """
+    token = request.headers["Authorization"]
+    if not validateToken(token):
+        raise Exception("Invalid Token")
+
+    return {
+        "pages": await run_in_threadpool(pageCache.stats),
+        "llm": await run_in_threadpool(llmCache.stats),
+        "search": serpCache.stats(),
+        "crawl": scheduler.stats(),
+        "openai": limiterStats(),
+    }
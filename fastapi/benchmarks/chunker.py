@@ -0,0 +1,112 @@
+"""
+Benchmark the token-aware chunker against the previous word-joining splitter.
+
+Inputs from 10 KB to 10 MB are built from a text file (repeated as needed) or from
+generated prose, so runs are repeatable and offline. The previous splitter is quadratic
+in the chunk size and is only run up to --legacy-max bytes.
+
+Usage (from the fastapi directory):
+    python -m benchmarks.chunker
+    python -m benchmarks.chunker --file page.md --sizes 10000 1000000 --repeat 5
+"""
+
+import argparse
+import random
+import statistics
+import time
+from constants import MAX_CONTEXT_WINDOW, SUMMARIZE_MODEL
+from tools.chunker import get_encoding, split_into_chunks
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+WORDS = (
+    "the of and to in is was for on that with as by at from this be are or an which "
+    "search engine results page crawl summary model token context window request "
+    "server document paragraph sentence language network latency throughput cache"
+).split()
+
+
+def legacy_split(text):
+    """split_text_into_chunks before the chunker: character limit, joined per word."""
+    words = text.split()
+    chunks = []
+    current_chunk = []
+
+    for word in words:
+        if len(" ".join(current_chunk + [word])) <= MAX_CONTEXT_WINDOW:
+            current_chunk.append(word)
+        else:
+            chunks.append(" ".join(current_chunk))
+            current_chunk = [word]
+
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+
+    return chunks
+
+
+def generate_text(size, seed=0):
+    rng = random.Random(seed)
+    paragraphs = []
+    length = 0
+    while length < size:
+        sentences = [
+            " ".join(rng.choices(WORDS, k=rng.randint(5, 30))).capitalize() + "."
+            for _ in range(rng.randint(1, 8))
+        ]
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:size]
+
+
+def build_text(size, source):
+    if not source:
+        return generate_text(size)
+    return (source * (size // len(source) + 1))[:size]
+
+
+def run(split, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = split(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings), len(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--file", help="text to repeat up to each size")
+    parser.add_argument("--sizes", type=int, nargs="*", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-max", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    source = None
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            source = f.read()
+
+    encoding = get_encoding(SUMMARIZE_MODEL)
+    tokenizer = encoding.name if encoding else "length estimate (no tokenizer)"
+    print(f"Tokenizer: {tokenizer}, best of {args.repeat}\n")
+    print(
+        f"{'size':>10}  {'splitter':<10} {'best':>10} {'median':>10} {'MB/s':>8} chunks"
+    )
+
+    for size in args.sizes:
+        text = build_text(size, source)
+        splitters = [("chunker", split_into_chunks)]
+        if size <= args.legacy_max:
+            splitters.append(("legacy", legacy_split))
+
+        for name, split in splitters:
+            best, median, chunks = run(split, text, args.repeat)
+            print(
+                f"{size:>10}  {name:<10} {best * 1000:8.1f}ms {median * 1000:8.1f}ms"
+                f" {size / best / 1e6:8.2f} {chunks}"
+            )
+
+
+if __name__ == "__main__":
+    main()
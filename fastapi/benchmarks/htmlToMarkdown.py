@@ -0,0 +1,123 @@
+"""
+Benchmark the in-process HTML to Markdown engine against the previous conversion paths.
+
+The corpus is a directory of stored .html pages, so runs are repeatable and offline;
+benchmarks/corpus holds a representative set (see its README.md).
+The previous paths need langchain-community, markdownify and unstructured installed;
+they are skipped when those packages are missing.
+
+Usage (from the fastapi directory):
+    python -m benchmarks.htmlToMarkdown --fetch https://example.com/ https://docs.python.org/3/
+    python -m benchmarks.htmlToMarkdown --repeat 5
+"""
+
+import argparse
+import hashlib
+import os
+import statistics
+import tempfile
+import time
+from urllib.parse import urlparse
+from tools.htmlToMarkdown import html_to_markdown
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+def fetch_corpus(urls, corpus):
+    import httpx
+
+    os.makedirs(corpus, exist_ok=True)
+    with httpx.Client(follow_redirects=True, timeout=30) as client:
+        for url in urls:
+            response = client.get(url)
+            digest = hashlib.sha1(url.encode()).hexdigest()[:10]
+            name = f"{urlparse(url).hostname}-{digest}.html"
+            with open(os.path.join(corpus, name), "w", encoding="utf-8") as f:
+                f.write(response.text)
+            print(f"Stored {url} as {name} ({len(response.text)} chars)")
+
+
+def load_corpus(corpus):
+    pages = {}
+    for name in sorted(os.listdir(corpus)):
+        if name.endswith(".html"):
+            with open(os.path.join(corpus, name), encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def unstructured_markdownify(html):
+    """The deepReadWebpage path before the engine: temp file, Unstructured, Markdownify."""
+    from langchain_community.document_loaders import UnstructuredHTMLLoader
+    from langchain_community.document_transformers import MarkdownifyTransformer
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmp_file:
+        tmp_file.write(html.encode("utf-8"))
+    try:
+        docs = UnstructuredHTMLLoader(tmp_file.name).load()
+        return MarkdownifyTransformer().transform_documents(docs)[0].page_content
+    finally:
+        os.unlink(tmp_file.name)
+
+
+def markdownify(html):
+    """The readWebpage path before the engine: Markdownify on the raw document."""
+    from langchain_core.documents import Document
+    from langchain_community.document_transformers import MarkdownifyTransformer
+
+    md = MarkdownifyTransformer()
+    return md.transform_documents([Document(page_content=html)])[0].page_content
+
+
+def run(name, convert, pages, repeat):
+    try:
+        convert("<html><body><p>warm up</p></body></html>")
+    except Exception as e:
+        print(f"{name:<26} skipped ({e})")
+        return None
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in pages.values():
+            convert(html)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(
+        f"{name:<26} best {best * 1000:9.1f} ms  median {statistics.median(timings) * 1000:9.1f} ms"
+        f"  ({best / len(pages) * 1000:.2f} ms/page)"
+    )
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--fetch", nargs="*", help="store these URLs in the corpus")
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_corpus(args.fetch, args.corpus)
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print(f"No .html pages in {args.corpus}, add some with --fetch")
+        return
+
+    size = sum(len(html) for html in pages.values())
+    print(f"{len(pages)} pages, {size / 1024:.0f} KiB of HTML, best of {args.repeat}\n")
+
+    engine = run("htmlToMarkdown", html_to_markdown, pages, args.repeat)
+    for name, convert in (
+        ("markdownify", markdownify),
+        ("unstructured+markdownify", unstructured_markdownify),
+    ):
+        baseline = run(name, convert, pages, args.repeat)
+        if baseline:
+            print(f"{'':<26} engine is {baseline / engine:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark the text cleaner against the previous four-pass clean_text.
+
+Single documents from 10 KB to 10 MB are cleaned by both implementations, then a
+batch of documents is cleaned serially and on the process pool. Inputs are built
+from a file (repeated as needed) or from generated HTML-like text with tags,
+entities and image URLs, so runs are repeatable and offline.
+
+Usage (from the fastapi directory):
+    python -m benchmarks.textCleaner
+    python -m benchmarks.textCleaner --file page.html --sizes 100000 --batch 64 100000
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import statistics
+import time
+from html import unescape
+from tools.processPool import getProcessPool, shutdownProcessPool
+from tools.textCleaner import clean_text, clean_texts, clean_texts_parallel
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+WORDS = (
+    "the of and to in is was for on that with as by at from this be are or an which "
+    "search engine results page crawl summary model token context window request"
+).split()
+MARKUP = [
+    "<p>",
+    "</p>",
+    '<a href="https://example.com/page">',
+    "</a>",
+    "&amp;",
+    "&nbsp;",
+    "&#8217;",
+    "https://example.com/images/photo.jpg",
+    "\n\n",
+    "   ",
+]
+
+
+def legacy_clean_text(text, remove_images=True):
+    """clean_text before the text cleaner: four passes, each compiled on the call."""
+    text = re.sub(r"<[^>]+>", "", text)
+    text = unescape(text)
+    if remove_images:
+        text = re.sub(
+            r"https?://[\w\.-]+/\S+\.(jpg|jpeg|png|gif|bmp)(\?\S*)?", "", text
+        )
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def generate_text(size, seed=0):
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        part = rng.choice(MARKUP) if rng.random() < 0.15 else rng.choice(WORDS)
+        parts.append(part)
+        length += len(part) + 1
+    return " ".join(parts)[:size]
+
+
+def build_text(size, source, seed=0):
+    if not source:
+        return generate_text(size, seed)
+    return (source * (size // len(source) + 1))[:size]
+
+
+def run(clean, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        clean(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings)
+
+
+async def run_parallel(texts, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await clean_texts_parallel(texts)
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--file", help="text to repeat up to each size")
+    parser.add_argument("--sizes", type=int, nargs="*", default=SIZES)
+    parser.add_argument(
+        "--batch",
+        type=int,
+        nargs=2,
+        default=[200, 100_000],
+        metavar=("COUNT", "SIZE"),
+        help="number and size of the documents of the batch",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    source = None
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            source = f.read()
+
+    print(f"Single documents, best of {args.repeat}\n")
+    print(f"{'size':>10}  {'cleaner':<10} {'best':>10} {'median':>10} {'MB/s':>8}")
+    for size in args.sizes:
+        text = build_text(size, source)
+        assert clean_text(text) == legacy_clean_text(text)
+        for name, clean in [("new", clean_text), ("legacy", legacy_clean_text)]:
+            best, median = run(clean, text, args.repeat)
+            print(
+                f"{size:>10}  {name:<10} {best * 1000:8.1f}ms {median * 1000:8.1f}ms"
+                f" {size / best / 1e6:8.2f}"
+            )
+
+    count, size = args.batch
+    texts = [build_text(size, source, seed) for seed in range(count)]
+    total = count * size
+    print(f"\nBatch of {count} documents of {size} bytes, best of {args.repeat}\n")
+    print(f"{'mode':<22} {'best':>10} {'median':>10} {'MB/s':>8}")
+
+    start = time.perf_counter()
+    # Start the workers up front, so the timings below do not include process startup
+    pool = getProcessPool()
+    list(pool.map(clean_texts, [[""]] * pool._max_workers))
+    print(f"{'pool startup':<22} {(time.perf_counter() - start) * 1000:8.1f}ms")
+
+    rows = [
+        (
+            "legacy serial",
+            run(lambda t: [legacy_clean_text(x) for x in t], texts, args.repeat),
+        ),
+        ("new serial", run(clean_texts, texts, args.repeat)),
+        ("new process pool", asyncio.run(run_parallel(texts, args.repeat))),
+    ]
+    for name, (best, median) in rows:
+        print(
+            f"{name:<22} {best * 1000:8.1f}ms {median * 1000:8.1f}ms"
+            f" {total / best / 1e6:8.2f}"
+        )
+    shutdownProcessPool()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,109 @@
+import json
 import os
 
 BLACKLISTED_PROXY_PATH = "blacklisted_proxies/blacklist.txt"
 WORKING_PROXY_PATH = "blacklisted_proxies/working_proxies.txt"
 IMAGE_DIR = "images"
 MAX_CONTEXT_WINDOW = 16000
+# Room left in the context window for the prompt and the summary
+SUMMARIZE_TOKEN_RESERVE = int(os.environ.get("SUMMARIZE_TOKEN_RESERVE", 1000))
+SUMMARIZE_CHUNK_TOKENS = int(
+    os.environ.get(
+        "SUMMARIZE_CHUNK_TOKENS", MAX_CONTEXT_WINDOW - SUMMARIZE_TOKEN_RESERVE
+    )
+)
+SUMMARIZE_CHUNK_OVERLAP = int(os.environ.get("SUMMARIZE_CHUNK_OVERLAP", 100))
+# Chunk summaries (or entity extractions) requested at once for one text; the rate
+# limiters pace the calls across all requests
+SUMMARIZE_CONCURRENCY = int(os.environ.get("SUMMARIZE_CONCURRENCY", 8))
+SUMMARIZE_MAX_REDUCE_LEVELS = int(os.environ.get("SUMMARIZE_MAX_REDUCE_LEVELS", 3))
+# Requests and tokens per minute allowed by the OpenAI account, per model, e.g.
+# OPENAI_RATE_LIMITS='{"gpt-4o": [500, 30000]}'
+OPENAI_RATE_LIMITS = json.loads(
+    os.environ.get(
+        "OPENAI_RATE_LIMITS",
+        '{"gpt-3.5-turbo-0125": [3500, 160000], "gpt-4o": [500, 30000]}',
+    )
+)
+# Extractive summaries (summarize_mode=extractive)
+EXTRACTIVE_SUMMARY_SENTENCES = int(os.environ.get("EXTRACTIVE_SUMMARY_SENTENCES", 7))
+# Share of the sentence score given to similarity with the query, when there is one
+EXTRACTIVE_QUERY_WEIGHT = float(os.environ.get("EXTRACTIVE_QUERY_WEIGHT", 0.5))
+OPENAI_DEFAULT_RATE_LIMIT = (500, 30000)
+OPENAI_MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", 5))
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", 120))
 SUMMARIZE_MODEL = "gpt-3.5-turbo-0125"
 JSON_MODEL = "gpt-4o"
 URL = os.environ["URL"]
 MAX_WORKERS = 2
 PAID_PROXY = "gw.dataimpulse.com:823"
+
+# Shared outbound HTTP client
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 30))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 10))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)
+)
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", 30))
+
+# On-disk caches (kept outside IMAGE_DIR so they are never served publicly)
+CACHE_DIR = os.environ.get("CACHE_DIR", "cache")
+PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", 60 * 60))
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("PAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 60 * 60))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Process pool shared by CPU-bound work (PDF extraction, batch text cleaning);
+# PDF_PROCESS_WORKERS is still honoured for existing deployments
+PROCESS_POOL_WORKERS = int(
+    os.environ.get(
+        "PROCESS_POOL_WORKERS",
+        os.environ.get("PDF_PROCESS_WORKERS", os.cpu_count() or 2),
+    )
+)
+
+# Text cleaning: batches larger than this are cleaned in parallel on the process pool
+TEXT_CLEAN_PARALLEL_MIN_BYTES = int(
+    os.environ.get("TEXT_CLEAN_PARALLEL_MIN_BYTES", 8 * 1024 * 1024)
+)
+
+# PDF extraction
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 40))
+PDF_RANGE_MIN_BYTES = int(os.environ.get("PDF_RANGE_MIN_BYTES", 5 * 1024 * 1024))
+PDF_RANGE_BLOCK_SIZE = int(os.environ.get("PDF_RANGE_BLOCK_SIZE", 256 * 1024))
+PDF_RANGE_TAIL_BYTES = int(os.environ.get("PDF_RANGE_TAIL_BYTES", 1024 * 1024))
+
+# Deep read crawler
+CRAWL_MAX_DEPTH = int(os.environ.get("CRAWL_MAX_DEPTH", 3))
+CRAWL_TIME_BUDGET = float(os.environ.get("CRAWL_TIME_BUDGET", 60))
+CRAWL_PER_HOST_LIMIT = int(os.environ.get("CRAWL_PER_HOST_LIMIT", 4))
+CRAWL_POLITENESS_DELAY = float(os.environ.get("CRAWL_POLITENESS_DELAY", 0.25))
+# Fetches in flight across all crawls in the process
+CRAWL_GLOBAL_CONCURRENCY = int(os.environ.get("CRAWL_GLOBAL_CONCURRENCY", 32))
+# Fetches a single crawl may have queued or in flight at once
+CRAWL_REQUEST_WINDOW = int(os.environ.get("CRAWL_REQUEST_WINDOW", 8))
+# Blocks found on at least this share of the crawled pages are treated as site boilerplate
+CRAWL_BOILERPLATE_RATIO = float(os.environ.get("CRAWL_BOILERPLATE_RATIO", 0.5))
+# Pages to fingerprint before the first page is stripped and summarized
+CRAWL_BOILERPLATE_WARMUP = int(os.environ.get("CRAWL_BOILERPLATE_WARMUP", 4))
+
+# Web search
+# Search results read and summarized at once
+SEARCH_CONCURRENCY = int(os.environ.get("SEARCH_CONCURRENCY", 10))
+# Seconds a result may take to read and summarize before it is returned as timed out
+SEARCH_RESULT_TIMEOUT = float(os.environ.get("SEARCH_RESULT_TIMEOUT", 20))
+# Search engine responses are served from memory for SERP_CACHE_TTL seconds, then
+# served stale while they are refreshed for SERP_CACHE_STALE_TTL seconds more
+SERP_CACHE_TTL = float(os.environ.get("SERP_CACHE_TTL", 5 * 60))
+SERP_CACHE_STALE_TTL = float(os.environ.get("SERP_CACHE_STALE_TTL", 60 * 60))
+SERP_CACHE_MAX_ENTRIES = int(os.environ.get("SERP_CACHE_MAX_ENTRIES", 1000))
+# Crawled results whose main content shares at least this share of its word shingles
+# (estimated with MinHash) are collapsed as near duplicates, e.g. syndicated articles
+# and mirrors
+NEAR_DUPLICATE_SIMILARITY = float(os.environ.get("NEAR_DUPLICATE_SIMILARITY", 0.7))
+# Words per shingle, and the shortest page that is fingerprinted at all
+NEAR_DUPLICATE_SHINGLE_WORDS = int(os.environ.get("NEAR_DUPLICATE_SHINGLE_WORDS", 3))
+NEAR_DUPLICATE_MIN_WORDS = int(os.environ.get("NEAR_DUPLICATE_MIN_WORDS", 50))
+# Searches accepted in one searchWebBatch request
+SEARCH_BATCH_MAX_QUERIES = int(os.environ.get("SEARCH_BATCH_MAX_QUERIES", 20))
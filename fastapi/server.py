@@ -14,6 +14,9 @@ from constants import URL, IMAGE_DIR
 
 # Import Routes
 from apis.base import api_router
+from tools.httpClient import closeClient
+from tools.processPool import shutdownProcessPool
+from tools.openAI import closeOpenAIClient
 
 # FastAPI Config
 app = FastAPI()
@@ -35,6 +38,14 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    # Close the pooled connections of the shared HTTP client
+    await closeClient()
+    await closeOpenAIClient()
+    shutdownProcessPool()
+
+
 @app.get("/privacy", response_class=HTMLResponse)
 async def privacy(request: Request):
     return templates.TemplateResponse("privacy.html", context={"request": request})
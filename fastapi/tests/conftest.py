@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The app imports its modules from the fastapi directory and reads these at import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("URL", "http://localhost")
+os.environ.setdefault("token", "test")
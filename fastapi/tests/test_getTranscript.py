@@ -0,0 +1,43 @@
+import asyncio
+from tools.youtube import getTranscript
+from tools.youtube.models import Transcription
+
+
+class StubProxyManager:
+    removed = []
+
+    def get_proxy(self):
+        return {"https": "http://proxy:8080"}
+
+    def remove_and_update_proxy(self, proxy):
+        self.removed.append(proxy)
+
+
+def test_getTranscription_fetches_transcript(monkeypatch):
+    calls = []
+
+    def get_transcript(video_id, languages=("en",), proxies=None):
+        calls.append((video_id, languages, proxies))
+        return [
+            {"text": "hello", "start": 0.0, "duration": 2.0},
+            {"text": "world", "start": 2.0, "duration": 3.0},
+        ]
+
+    monkeypatch.setattr(getTranscript, "ProxyManager", StubProxyManager)
+    # get_transcript is gone from youtube-transcript-api 1.2, so it may not exist here
+    monkeypatch.setattr(
+        getTranscript.YouTubeTranscriptApi,
+        "get_transcript",
+        get_transcript,
+        raising=False,
+    )
+
+    data = Transcription(urls=["https://www.youtube.com/watch?v=SA2iWivDJiE"])
+    response = asyncio.run(getTranscript.getTranscription(data))
+
+    assert calls == [("SA2iWivDJiE", ["en", "en-US"], {"https": "http://proxy:8080"})]
+    assert response.urls == ["https://www.youtube.com/watch?v=SA2iWivDJiE"]
+    assert [slot.text for slot in response.transcripts[0].transcript] == [
+        " hello world"
+    ]
+    assert StubProxyManager.removed == []
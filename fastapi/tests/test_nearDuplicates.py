@@ -0,0 +1,76 @@
+import random
+from tools.searchWeb.models import ResultStatus, SearchResult
+from tools.searchWeb.nearDuplicates import NearDuplicateIndex, minhash
+from tools.searchWeb.searchWeb import collapseDuplicates
+
+WORDS = [f"w{i}" for i in range(2000)]
+# MinHash of "the quick brown fox", the same in every process
+EXPECTED = [7622828, 47276185, 718358848]
+
+
+def article(seed, words=200):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def test_minhash_is_stable():
+    assert minhash("the quick brown fox".split())[:3].tolist() == EXPECTED
+
+
+def test_index_matches_copies_only():
+    index = NearDuplicateIndex()
+    assert index.add("https://a.org/1", article(1)) is None
+    assert index.add("https://b.org/1", article(1) + " shared by") == "https://a.org/1"
+    assert index.add("https://a.org/2", article(2)) is None
+    assert index.add("https://c.org/short", "too short") is None
+
+
+def test_signatures_carry_over_between_indexes():
+    # searchBatch signs each page once and matches the signatures per search
+    signer = NearDuplicateIndex()
+    signer.add("https://a.org/1", article(1))
+    index = NearDuplicateIndex()
+    assert index.add("https://b.org/1", article(1)) is None
+    assert (
+        index.add_signature("https://a.org/1", signer.signatures["https://a.org/1"])
+        == "https://b.org/1"
+    )
+
+
+def test_collapse_keeps_best_ranked_result():
+    index = NearDuplicateIndex()
+    # The lower ranked copy was read (and summarized) first
+    index.add("https://copy.org/a", article(1))
+    index.add("https://source.org/a", article(1))
+    results = [
+        SearchResult(
+            url="https://source.org/a",
+            title="Source",
+            description="",
+            status=ResultStatus.duplicate,
+        ),
+        SearchResult(
+            url="https://other.org/b",
+            title="Other",
+            description="",
+            content="b",
+            status=ResultStatus.summarized,
+        ),
+        SearchResult(
+            url="https://copy.org/a",
+            title="Copy",
+            description="",
+            content="summary",
+            status=ResultStatus.summarized,
+        ),
+    ]
+
+    collapsed = collapseDuplicates(results, index)
+
+    assert [result.url for result in collapsed] == [
+        "https://source.org/a",
+        "https://other.org/b",
+    ]
+    assert collapsed[0].content == "summary"
+    assert collapsed[0].status == ResultStatus.summarized
+    assert collapsed[0].duplicates == ["https://copy.org/a"]
@@ -0,0 +1,44 @@
+import glob
+import os
+import pytest
+from benchmarks.textCleaner import generate_text, legacy_clean_text
+from tools.textCleaner import clean_text, clean_texts
+
+CORPUS = sorted(
+    glob.glob(
+        os.path.join(os.path.dirname(__file__), "..", "benchmarks", "corpus", "*.html")
+    )
+)
+
+
+@pytest.mark.parametrize("remove_images", [True, False])
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_matches_legacy_cleaner_on_corpus(path, remove_images):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    assert clean_text(html, remove_images) == legacy_clean_text(html, remove_images)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_legacy_cleaner_on_generated_markup(seed):
+    text = generate_text(20_000, seed)
+    assert clean_text(text) == legacy_clean_text(text)
+    assert clean_text(text, False) == legacy_clean_text(text, False)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "<p>Fish &amp; chips</p>  https://x.org/a.png  here",
+        "https://x.org/img.png?a=1&amp;b=2 &lt;b&gt; &copy2024 &notit;",
+        '<a href="https://x.org/i.png">&nbsp;caf&eacute;</a>\n\n\tend',
+        "no markup at all",
+    ],
+)
+def test_matches_legacy_cleaner(text):
+    assert clean_text(text) == legacy_clean_text(text)
+    assert clean_text(text, False) == legacy_clean_text(text, False)
+
+
+def test_clean_texts_keeps_order_and_non_strings():
+    assert clean_texts(["<b>a</b>", None, "b  c"]) == ["a", None, "b c"]
@@ -1,15 +1,15 @@
 import os
-import requests
 import uuid
 from constants import IMAGE_DIR
 from tools.apexgraphs.models import ApexChartRequest
 from tools.models import CommandResponse
 from tools.urlBuilder import urlFor, staticURL
+from tools.httpClient import getClient
 
 
-def createApexCharts(data: ApexChartRequest) -> CommandResponse:
+async def createApexCharts(data: ApexChartRequest) -> CommandResponse:
     try:
-        response = requests.get(
+        response = await getClient().get(
             "https://quickchart.io/apex-charts/render", params=data.dict()
         )
         if response.status_code == 200:
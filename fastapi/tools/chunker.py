@@ -0,0 +1,132 @@
+import re
+from functools import lru_cache
+from typing import List
+import tiktoken
+from constants import SUMMARIZE_MODEL, SUMMARIZE_CHUNK_TOKENS, SUMMARIZE_CHUNK_OVERLAP
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+# Rough size of a token in characters, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = SUMMARIZE_MODEL):
+    """
+    The tiktoken encoding of a model, or None when it cannot be loaded.
+
+    tiktoken downloads its vocabulary on first use; when that fails (offline hosts) the
+    chunker falls back to estimating tokens from the length of the text.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"Could not load the tokenizer for {model}, estimating tokens: {e}")
+        return None
+
+
+def _count(text: str, encoding) -> int:
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode_ordinary(text))
+
+
+def count_tokens(text: str, model: str = SUMMARIZE_MODEL) -> int:
+    return _count(text, get_encoding(model))
+
+
+def _split_long(sentence: str, max_tokens: int, encoding) -> List[str]:
+    """Cut a single sentence that is over the limit into pieces of max_tokens."""
+    if encoding is None:
+        size = max_tokens * CHARS_PER_TOKEN
+        return [sentence[i : i + size] for i in range(0, len(sentence), size)]
+    tokens = encoding.encode_ordinary(sentence)
+    return [
+        encoding.decode(tokens[i : i + max_tokens])
+        for i in range(0, len(tokens), max_tokens)
+    ]
+
+
+def _paragraphs(text: str, max_tokens: int, encoding):
+    """Yields every paragraph as a list of (sentence, tokens) no longer than max_tokens."""
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        sentences = []
+        for sentence in SENTENCE_END.split(paragraph.strip()):
+            sentence = " ".join(sentence.split())
+            if not sentence:
+                continue
+            tokens = _count(sentence, encoding)
+            if tokens <= max_tokens:
+                sentences.append((sentence, tokens))
+            else:
+                sentences.extend(
+                    (piece, _count(piece, encoding))
+                    for piece in _split_long(sentence, max_tokens, encoding)
+                )
+        if sentences:
+            yield sentences
+
+
+def split_into_chunks(
+    text: str,
+    max_tokens: int = SUMMARIZE_CHUNK_TOKENS,
+    overlap: int = SUMMARIZE_CHUNK_OVERLAP,
+    model: str = SUMMARIZE_MODEL,
+) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens model tokens.
+
+    Every sentence is tokenized once and chunks are filled greedily, so the cost is
+    linear in the size of the text. Chunks end on sentence boundaries, and a paragraph
+    that does not fit in a chunk that is already half full starts the next one. Each
+    chunk after the first repeats up to `overlap` tokens of trailing sentences from the
+    previous chunk. Sentences longer than max_tokens are cut at token boundaries.
+
+    Example:
+        >>> split_into_chunks("One. Two.\\n\\nThree.", max_tokens=8, overlap=0)
+        ['One. Two.', 'Three.']
+    """
+    encoding = get_encoding(model)
+    overlap = min(overlap, max_tokens // 2)
+    chunks = []
+    # Sentences of the current chunk as (separator, sentence, tokens); separators are
+    # counted as a token per character, which keeps the total an upper bound
+    current = []
+    size = 0
+    fresh = False  # Whether the chunk holds more than the overlap of the previous one
+
+    def flush():
+        nonlocal current, size, fresh
+        chunks.append("".join(sep + sentence for sep, sentence, _ in current).lstrip())
+        kept, kept_size = [], 0
+        for item in reversed(current):
+            if kept_size + item[2] > overlap:
+                break
+            kept.append(item)
+            kept_size += item[2]
+        current, size, fresh = kept[::-1], kept_size, False
+
+    for sentences in _paragraphs(text, max_tokens - 2, encoding):
+        paragraph_size = sum(tokens + 1 for _, tokens in sentences) + 1
+        if fresh and size + paragraph_size > max_tokens and size >= max_tokens // 2:
+            flush()
+
+        separator = "\n\n"
+        for sentence, tokens in sentences:
+            cost = tokens + len(separator)
+            if fresh and size + cost > max_tokens:
+                flush()
+            # The overlap carried over may still leave too little room
+            while current and size + cost > max_tokens:
+                size -= current.pop(0)[2]
+
+            current.append((separator if current else "", sentence, cost))
+            size += cost
+            fresh = True
+            separator = " "
+
+    if fresh:
+        flush()
+    return chunks
@@ -0,0 +1,77 @@
+import asyncio
+import math
+from typing import List
+from constants import CRAWL_BOILERPLATE_RATIO, CRAWL_BOILERPLATE_WARMUP
+
+
+def split_blocks(markdown: str) -> List[str]:
+    """
+    Split Markdown into blank-line separated blocks, keeping fenced code blocks whole.
+
+    Example:
+        >>> split_blocks("# Title\\n\\nText\\n\\n```\\na\\n\\nb\\n```")
+        ['# Title', 'Text', '```\\na\\n\\nb\\n```']
+    """
+    blocks = []
+    in_code = False
+    for piece in markdown.split("\n\n"):
+        if in_code:
+            blocks[-1] += "\n\n" + piece
+        else:
+            blocks.append(piece)
+        fences = sum(1 for line in piece.split("\n") if line.startswith("```"))
+        if fences % 2:
+            in_code = not in_code
+    return blocks
+
+
+def fingerprint(block: str) -> int:
+    return hash(" ".join(block.lower().split()))
+
+
+class BoilerplateFilter:
+    """
+    Strips the site template (menus, headers, footers) repeated across a crawl.
+
+    Every page is fingerprinted block by block, and blocks found on at least `ratio` of
+    the pages seen so far (and on two pages at least) are removed. Since pages are
+    converted and summarized while the crawl is still running, the first `warmup` pages
+    wait for each other so that the initial counts are meaningful; pages after them are
+    stripped against the counts at the time they arrive.
+    """
+
+    def __init__(
+        self,
+        warmup: int = CRAWL_BOILERPLATE_WARMUP,
+        ratio: float = CRAWL_BOILERPLATE_RATIO,
+    ):
+        self.warmup = max(warmup, 1)
+        self.ratio = ratio
+        self.pages = 0
+        self.counts = {}
+        self.warmed_up = asyncio.Event()
+
+    def add(self, markdown: str):
+        for key in {fingerprint(block) for block in split_blocks(markdown)}:
+            self.counts[key] = self.counts.get(key, 0) + 1
+        self.pages += 1
+        if self.pages >= self.warmup:
+            self.warmed_up.set()
+
+    def close(self):
+        """No more pages are coming, so pages still in the warm-up can go ahead."""
+        self.warmed_up.set()
+
+    def strip(self, markdown: str) -> str:
+        threshold = max(2, math.ceil(self.ratio * self.pages))
+        blocks = [
+            block
+            for block in split_blocks(markdown)
+            if self.counts.get(fingerprint(block), 0) < threshold
+        ]
+        return "\n\n".join(blocks)
+
+    async def dedupe(self, markdown: str) -> str:
+        self.add(markdown)
+        await self.warmed_up.wait()
+        return self.strip(markdown)
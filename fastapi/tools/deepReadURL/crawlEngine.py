@@ -0,0 +1,137 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from tools.deepReadURL.crawler import ParsedPage, parse_page
+from tools.httpClient import getClient
+from tools.scheduler import scheduler
+from tools.threadingUtils import run_in_threadpool
+from tools.urlUtils import canonicalize_url
+
+
+@dataclass
+class CrawledPage:
+    url: str
+    depth: int
+    page: ParsedPage
+
+
+class CrawlEngine:
+    """
+    Breadth-first crawler behind deepReadWebpage.
+
+    Pages are crawled level by level up to `depth` link hops from the start URL, within
+    a budget of `max_pages` pages and `time_budget` seconds. Links are canonicalized
+    (fragments and tracking parameters stripped) before being checked against the
+    visited set. Fetches go through the process-wide scheduler, which shares the
+    connection budget fairly between concurrent crawls and caps requests per host.
+    """
+
+    def __init__(
+        self,
+        depth: int,
+        max_pages: int,
+        time_budget: float,
+        same_host: bool = False,
+    ):
+        self.depth = depth
+        self.max_pages = max_pages
+        self.time_budget = time_budget
+        self.same_host = same_host
+        self.lane = scheduler.lane()
+        self.visited = set()
+
+    async def _fetch(self, url: str) -> ParsedPage:
+        try:
+            async with self.lane.slot(url):
+                print(f"Fetching {url}")
+                response = await getClient().get(url)
+
+            if not response.is_success:
+                print(f"Skipping {url}: HTTP {response.status_code}")
+                return None
+
+            content_type = response.headers.get("Content-Type", "text/html")
+            if "html" not in content_type:
+                print(f"Skipping {url}: not an HTML page ({content_type})")
+                return None
+
+            # Redirect targets count as visited too, and relative links resolve
+            # against them
+            final_url = str(response.url)
+            self.visited.add(canonicalize_url(final_url))
+            return await run_in_threadpool(parse_page, response.text, final_url)
+        except Exception as e:
+            print(f"Exception on reading {url}: {e}")
+            return None
+
+    def _follow(self, link: str, start_host: str) -> bool:
+        parts = urlsplit(link)
+        if parts.scheme not in ("http", "https"):
+            return False
+        if self.same_host and parts.hostname != start_host:
+            return False
+
+        key = canonicalize_url(link)
+        if key in self.visited:
+            return False
+        self.visited.add(key)
+        return True
+
+    async def crawl(self, start_url: str):
+        """Yields a CrawledPage for every page fetched, in breadth-first order."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.time_budget
+        start_host = urlsplit(start_url).hostname
+        self.visited.add(canonicalize_url(start_url))
+
+        frontier = [start_url]
+        pages = 0
+        for depth in range(self.depth + 1):
+            queue = deque(frontier)
+            frontier = []
+            pending = {}
+            try:
+                while queue or pending:
+                    # Keep enough fetches in flight to fill the page budget, but no
+                    # more than the scheduler lets one crawl queue up
+                    while (
+                        queue
+                        and pages + len(pending) < self.max_pages
+                        and len(pending) < self.lane.window
+                    ):
+                        url = queue.popleft()
+                        pending[asyncio.create_task(self._fetch(url))] = url
+
+                    if not pending:
+                        break
+
+                    done, _ = await asyncio.wait(
+                        pending,
+                        timeout=deadline - loop.time(),
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    if not done:
+                        print(f"Crawl time budget of {self.time_budget}s exhausted")
+                        return
+
+                    for task in done:
+                        url = pending.pop(task)
+                        page = task.result()
+                        if page is None:
+                            continue
+
+                        pages += 1
+                        if depth < self.depth:
+                            frontier.extend(
+                                link
+                                for link in page.links
+                                if self._follow(link, start_host)
+                            )
+                        yield CrawledPage(url=url, depth=depth, page=page)
+            finally:
+                for task in pending:
+                    task.cancel()
+
+            if not frontier or pages >= self.max_pages:
+                return
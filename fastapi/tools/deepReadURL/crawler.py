@@ -1,83 +1,75 @@
-from bs4 import BeautifulSoup
-from minify_html import minify
+from dataclasses import dataclass, field
+from typing import List
 from urllib.parse import urljoin
-import tempfile
-from langchain_community.document_transformers import MarkdownifyTransformer
-from langchain_community.document_loaders import UnstructuredHTMLLoader
+from tools.htmlToMarkdown import parse_html, element_to_markdown
 
 
-def html_to_markdown(minimized_body: str) -> str:
-    # Create a temporary file to store the HTML content
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmp_file:
-        tmp_file.write(minimized_body.encode("utf-8"))
-        tmp_file_path = tmp_file.name
+@dataclass
+class ParsedPage:
+    title: str = ""
+    body: object = None  # lxml <body> element, None if the page has no body
+    links: List[str] = field(default_factory=list)
+    images: List[str] = field(default_factory=list)
 
-    # Load the HTML content
-    loader = UnstructuredHTMLLoader(tmp_file_path)
-    docs = loader.load()
 
-    # Transform the loaded HTML content to Markdown
-    md = MarkdownifyTransformer()
-    converted_docs = md.transform_documents(docs)
+def parse_page(html_content: str, base_url: str) -> ParsedPage:
+    """
+    Parses a page with lxml and collects everything the crawler needs in a single pass.
+
+    Args:
+        html_content (str): The HTML content to be processed.
+        base_url (str): The URL the page was fetched from, used to resolve relative links.
 
-    # Return the Markdown content
-    return converted_docs[0].page_content
+    Returns:
+        ParsedPage: The title, the <body> element, and the absolute link and image URLs.
+
+    Script and style elements are left in the tree; the Markdown converter skips them.
+    """
+    page = ParsedPage()
+    tree = parse_html(html_content)
+    if tree is None:
+        return page
+
+    for element in tree.iter("title", "base", "a", "img", "body"):
+        tag = element.tag
+        if tag == "a":
+            href = element.get("href")
+            if href is not None:
+                page.links.append(urljoin(base_url, href.strip()))
+        elif tag == "img":
+            src = element.get("src")
+            if src is not None:
+                page.images.append(urljoin(base_url, src.strip()))
+        elif tag == "title" and not page.title:
+            page.title = element.text_content()
+        elif tag == "base" and element.get("href"):
+            base_url = urljoin(base_url, element.get("href"))
+        elif tag == "body" and page.body is None:
+            page.body = element
+
+    return page
 
 
 def cleanup_html(html_content: str, base_url: str) -> str:
     """
-    Processes HTML content by removing unnecessary tags, minifying the HTML, and extracting the title and body content.
+    Processes HTML content by extracting the title, links, images and body content.
 
     Args:
         html_content (str): The HTML content to be processed.
+        base_url (str): The URL the page was fetched from.
 
     Returns:
-        str: A string combining the parsed title and the minified body content. If no body content is found, it indicates so.
+        tuple: The title, the body converted to Markdown, the absolute link URLs and the image URLs. If no body content is found, it indicates so.
 
     Example:
         >>> html_content = "<html><head><title>Example</title></head><body><p>Hello World!</p></body></html>"
-        >>> remover(html_content)
-        'Title: Example, Body: <body><p>Hello World!</p></body>'
-
-    This function is particularly useful for preparing HTML content for environments where bandwidth usage needs to be minimized.
+        >>> cleanup_html(html_content, "https://example.com")
+        ('Example', 'Hello World!', [], [])
     """
+    page = parse_page(html_content, base_url)
 
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    # Title Extraction
-    title_tag = soup.find("title")
-    title = title_tag.get_text() if title_tag else ""
-
-    # Script and Style Tag Removal
-    for tag in soup.find_all(["script", "style"]):
-        tag.extract()
-
-    # Links extraction
-    links = soup.find_all("a")
-    link_urls = []
-    for link in links:
-        if "href" in link.attrs:
-            link_urls.append(urljoin(base_url, link["href"]))
-
-    # Images extraction
-    images = soup.find_all("img")
-    image_urls = []
-    for image in images:
-        if "src" in image.attrs:
-            # if http or https is not present in the image url, join it with the base url
-            if "http" not in image["src"]:
-                image_urls.append(urljoin(base_url, image["src"]))
-            else:
-                image_urls.append(image["src"])
-
-    # Body Extraction (if it exists)
-    body_content = soup.find("body")
-    if body_content:
-        # Minify the HTML within the body tag
-        minimized_body = minify(str(body_content))
-
-        return title, html_to_markdown(minimized_body), link_urls, image_urls
-        # return "Title: " + title + ", Body: " + minimized_body + ", Links: " + str(link_urls) + ", Images: " + str(image_urls)
+    if page.body is not None:
+        return page.title, element_to_markdown(page.body), page.links, page.images
 
     # throw an error if no body content is found
-    return title, "No Body Content Found", link_urls, image_urls
+    return page.title, "No Body Content Found", page.links, page.images
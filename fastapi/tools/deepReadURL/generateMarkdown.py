@@ -1,65 +1,147 @@
+import asyncio
+import time
 from tools.deepReadURL.models import DeepResponse, INFO, DeepReadURL
-import requests
-from tools.deepReadURL.crawler import cleanup_html
-import concurrent.futures
-from tools.openAI import process_search_results, clean_text
+from tools.deepReadURL.crawlEngine import CrawlEngine, CrawledPage
+from tools.deepReadURL.boilerplate import BoilerplateFilter
+from constants import CRAWL_BOILERPLATE_WARMUP
+from tools.htmlToMarkdown import element_to_markdown
+from tools.mainContent import main_content_or_full
+from tools.models import ContentMode
+from tools.openAI import process_search_results
+from tools.textCleaner import clean_text
+from tools.rateLimiter import Priority
+from tools.threadingUtils import run_in_threadpool
 
 
-def deepSearchForPage(data: DeepReadURL) -> DeepResponse:
+def bodyToMarkdown(body, mode: ContentMode) -> str:
+    if mode == ContentMode.main:
+        body = main_content_or_full(body)
+    return element_to_markdown(body)
+
+
+async def processPage(
+    crawled: CrawledPage, data: DeepReadURL, boilerplate: BoilerplateFilter = None
+) -> INFO:
     try:
-        urls = []
-        information = []
-        source = data.url
-        response = requests.get(source)
-        title, minimized_body, link_urls, image_urls = cleanup_html(
-            response.text, source
-        )
+        page = crawled.page
+        if page.body is not None:
+            body = await run_in_threadpool(bodyToMarkdown, page.body, data.mode)
+            if boilerplate is not None:
+                body = await boilerplate.dedupe(body)
+        else:
+            body = "No Body Content Found"
+
         if data.summarize:
-            minimized_body = process_search_results(None, minimized_body, data.entities)
+            body = await process_search_results(
+                None,
+                body,
+                data.entities,
+                data.llm_cache,
+                Priority.bulk,
+                data.summarize_mode,
+            )
 
-        limit_pages = data.limit - 1
-        link_urls = list(set(link_urls))
-        if len(link_urls) > limit_pages:
-            link_urls = link_urls[:limit_pages]
+        # The start page is returned as is, linked pages are cleaned up
+        if crawled.depth > 0:
+            body = clean_text(body, True)
 
-        urls.append(source)
-        information.append(
-            INFO(title=title, body=minimized_body, links=link_urls, images=image_urls)
+        return INFO(
+            title=page.title,
+            body=body,
+            links=list(dict.fromkeys(page.links)),
+            images=page.images,
         )
+    except Exception as e:
+        print(f"Exception on processing {crawled.url}: {e}")
+        return None
+
+
+async def crawlPages(data: DeepReadURL):
+    """
+    Yields (order, url, INFO) for every page as soon as it is converted and summarized.
+
+    Pages come out in completion order; `order` is the position of the page in the
+    crawl. Each page body is only held until it has been handed to the consumer.
+    """
+    engine = CrawlEngine(
+        depth=data.depth,
+        max_pages=data.limit,
+        time_budget=data.time_budget,
+        same_host=data.same_host,
+    )
+    boilerplate = None
+    if data.dedup and data.depth > 0 and data.limit > 1:
+        boilerplate = BoilerplateFilter(
+            warmup=min(CRAWL_BOILERPLATE_WARMUP, data.limit)
+        )
+    results = asyncio.Queue()
+    tasks = set()
+
+    async def process(order: int, crawled: CrawledPage):
+        info = await processPage(crawled, data, boilerplate)
+        await results.put((order, crawled.url, info))
+
+    async def produce():
+        # Convert and summarize each page while the crawl carries on
+        order = 0
+        try:
+            async for crawled in engine.crawl(data.url):
+                task = asyncio.create_task(process(order, crawled))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                order += 1
+        finally:
+            if boilerplate is not None:
+                boilerplate.close()
+            if tasks:
+                await asyncio.wait(set(tasks))
+            await results.put(None)
 
-        def fetch_and_process(link):
-            try:
-                print(f"Fetching {link}")
-                response = requests.get(link)
-                title, minimized_body, link_urls, image_urls = cleanup_html(
-                    response.text, link
-                )
-                if data.summarize:
-                    minimized_body = process_search_results(
-                        None, minimized_body, data.entities
-                    )
-
-                content = INFO(
-                    title=title,
-                    body=clean_text(minimized_body, True),
-                    links=link_urls,
-                    images=image_urls,
-                )
-                return (link, content)
-            except Exception as e:
-                print(f"Exception on reading {link}: {e}")
-                return None
-
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [executor.submit(fetch_and_process, link) for link in link_urls]
-            for future in concurrent.futures.as_completed(futures):
-                result = future.result()
-                if result:
-                    link, content = result
-                    urls.append(link)
-                    information.append(content)
-
-        return DeepResponse(urls=urls, info=information)
+    producer = asyncio.create_task(produce())
+    try:
+        while (result := await results.get()) is not None:
+            if result[2] is not None:
+                yield result
+        await producer
+    finally:
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
+
+
+async def deepSearchForPage(data: DeepReadURL) -> DeepResponse:
+    source = data.url
+    try:
+        pages = sorted([page async for page in crawlPages(data)])
+        return DeepResponse(
+            urls=[url for _, url, _ in pages], info=[info for _, _, info in pages]
+        )
     except Exception as e:
         print(f"Exception on reading {source}: {e}")
-        return DeepResponse(urls=[], info=["Could not read the page"])
+        return DeepResponse(urls=[], info=[])
+
+
+async def streamDeepSearchForPage(data: DeepReadURL):
+    """
+    Yields a ("page", ...) event per page as soon as it is ready, then a final
+    ("summary", ...) event with the crawled URLs in crawl order.
+    """
+    start = time.monotonic()
+    pages = []
+    error = None
+    try:
+        async for order, url, info in crawlPages(data):
+            pages.append((order, url))
+            yield "page", {"url": url, "info": info.model_dump()}
+    except Exception as e:
+        print(f"Exception on reading {data.url}: {e}")
+        error = str(e)
+
+    summary = {
+        "urls": [url for _, url in sorted(pages)],
+        "pages": len(pages),
+        "elapsed": round(time.monotonic() - start, 3),
+    }
+    if error:
+        summary["error"] = error
+    yield "summary", summary
@@ -1,5 +1,8 @@
-from typing import List
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
+from tools.entityExtraction import check_entities
+from tools.models import ContentMode, StreamFormat, SummarizeMode
+from constants import CRAWL_MAX_DEPTH, CRAWL_TIME_BUDGET
 
 
 class INFO(BaseModel):
@@ -16,14 +19,55 @@ class DeepResponse(BaseModel):
 
 class DeepReadURL(BaseModel):
     url: str
-    limit: int = 10
+    limit: int = Field(
+        10,
+        description="Maximum number of pages to read, including the start page.",
+        ge=1,
+    )
+    depth: int = Field(
+        1,
+        description="How many link hops to follow from the start page.",
+        ge=0,
+        le=CRAWL_MAX_DEPTH,
+    )
+    time_budget: float = Field(
+        CRAWL_TIME_BUDGET, description="Stop crawling after this many seconds.", gt=0
+    )
+    same_host: bool = Field(
+        False, description="Only follow links on the host of the start page."
+    )
+    mode: ContentMode = Field(
+        ContentMode.full,
+        description="'main' keeps only the main content of each page, 'full' keeps everything.",
+    )
+    dedup: bool = Field(
+        True,
+        description="Strip blocks repeated on most crawled pages, such as menus and footers.",
+    )
     summarize: bool = False
     entities: str = None
+    summarize_mode: SummarizeMode = Field(
+        SummarizeMode.abstractive,
+        description="'extractive' picks key sentences locally instead of calling the LLM.",
+    )
+    llm_cache: bool = Field(
+        True, description="Reuse cached LLM responses for identical prompts."
+    )
+    stream: Optional[StreamFormat] = Field(
+        None,
+        description="Stream each page as it is read, as NDJSON lines or Server-Sent Events.",
+    )
+
+    @field_validator("entities")
+    @classmethod
+    def check_entities(cls, value):
+        return check_entities(value)
 
     class Config:
         json_schema_extra = {
             "example": {
                 "url": "https://en.wikipedia.org/wiki/Adolf_Hitler",
                 "limit": 10,
+                "depth": 1,
             }
         }
@@ -0,0 +1,130 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    data: dict
+    blob: bytes
+    stored_at: float
+    fresh: bool
+
+    @property
+    def age(self):
+        return time.time() - self.stored_at
+
+
+class DiskCache:
+    """
+    Size bounded key/value store on top of SQLite, shared by every worker process.
+
+    Each entry holds a JSON document plus an optional binary blob. Entries older than
+    the TTL are still returned (flagged as not fresh) so callers can revalidate them;
+    once the store grows past max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, name: str, directory: str, max_bytes: int, ttl: float):
+        self.name = name
+        self.path = os.path.join(directory, f"{name}.sqlite3")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, data TEXT NOT NULL, blob BLOB, "
+                "size INTEGER NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> CacheEntry:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT data, blob, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            conn.commit()
+
+        data, blob, stored_at = row
+        return CacheEntry(
+            key=key,
+            data=json.loads(data),
+            blob=blob or b"",
+            stored_at=stored_at,
+            fresh=time.time() - stored_at < self.ttl,
+        )
+
+    def put(self, key: str, data: dict, blob: bytes = b""):
+        encoded = json.dumps(data)
+        size = len(key) + len(encoded) + len(blob)
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, encoded, blob, size, now, now),
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def touch(self, key: str):
+        """Mark an entry as fresh again, e.g. after a successful revalidation."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, key),
+            )
+            conn.commit()
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until the store fits again
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at"
+        ).fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.counters["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def count(self, counter: str):
+        self.counters[counter] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connect()
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, **self.counters}
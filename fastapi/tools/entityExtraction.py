@@ -0,0 +1,123 @@
+import json
+from typing import Any, List
+
+# Value of a field with no example in the entities template
+SCALAR_SCHEMA = {
+    "anyOf": [
+        {"type": "string"},
+        {"type": "number"},
+        {"type": "boolean"},
+        {"type": "null"},
+    ]
+}
+
+
+def parse_entities(entities: str) -> dict:
+    """
+    The entities template as a dict of field name to example value.
+
+    Accepts a JSON object, a JSON list of field names or comma-separated field names.
+
+    Example:
+        >>> parse_entities('["name", "price"]')
+        {'name': None, 'price': None}
+        >>> parse_entities("name, price")
+        {'name': None, 'price': None}
+    """
+    try:
+        template = json.loads(entities)
+    except ValueError:
+        template = [name.strip() for name in entities.split(",")]
+    if isinstance(template, dict):
+        return template
+    if isinstance(template, list):
+        return {str(name): None for name in template if str(name).strip()}
+    return {str(template): None}
+
+
+def check_entities(entities: str) -> str:
+    """
+    Validates the entities template of a request, so that it makes a strict schema.
+
+    Example:
+        >>> check_entities("{}")
+        Traceback (most recent call last):
+        ...
+        ValueError: entities must name at least one field
+    """
+    if entities and not parse_entities(entities):
+        raise ValueError("entities must name at least one field")
+    return entities
+
+
+def _schema(example: Any) -> dict:
+    if isinstance(example, dict) and example:
+        return {
+            "type": "object",
+            "properties": {key: _schema(value) for key, value in example.items()},
+            "required": list(example),
+            "additionalProperties": False,
+        }
+    if isinstance(example, list):
+        item = _schema(example[0]) if example else {"type": "string"}
+        return {"anyOf": [{"type": "array", "items": item}, {"type": "null"}]}
+    return SCALAR_SCHEMA
+
+
+def response_format(template: dict) -> dict:
+    """Strict JSON schema response format with exactly the fields of the template."""
+    if not template:
+        # Strict mode only accepts an object at the root
+        raise ValueError("The entities template has no fields")
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "entities",
+            "strict": True,
+            "schema": _schema(template),
+        },
+    }
+
+
+def _empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _merge(values: List[Any]) -> Any:
+    values = [value for value in values if not _empty(value)]
+    if not values:
+        return None
+    if all(isinstance(value, dict) for value in values):
+        keys = list(dict.fromkeys(key for value in values for key in value))
+        return {key: _merge([value.get(key) for value in values]) for key in keys}
+
+    # Distinct values in chunk order; lists are flattened into one list
+    distinct = {}
+    for value in values:
+        for item in value if isinstance(value, list) else [value]:
+            if not _empty(item):
+                distinct.setdefault(json.dumps(item, sort_keys=True), item)
+    items = list(distinct.values())
+    if any(isinstance(value, list) for value in values) or len(items) > 1:
+        return items
+    return items[0]
+
+
+def merge_entities(template: dict, objects: List[dict]) -> dict:
+    """
+    Merge the fields extracted from each chunk, in chunk order, into one object.
+
+    Empty values are ignored. A field found with one value keeps it, a field found with
+    several distinct values (or as a list) becomes the list of them, and objects are
+    merged field by field. The result has exactly the fields of the template.
+
+    Example:
+        >>> merge_entities(
+        ...     {"name": None, "price": None, "tags": []},
+        ...     [{"name": "Pro", "price": None, "tags": ["a"]},
+        ...      {"name": "Pro", "price": 10, "tags": ["b", "a"], "extra": 1}],
+        ... )
+        {'name': 'Pro', 'price': 10, 'tags': ['a', 'b']}
+    """
+    merged = _merge([{key: obj.get(key) for key in template} for obj in objects])
+    return merged or {key: None for key in template}
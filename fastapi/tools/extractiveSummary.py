@@ -0,0 +1,130 @@
+import re
+from collections import Counter
+from typing import List
+import numpy as np
+from constants import EXTRACTIVE_SUMMARY_SENTENCES, EXTRACTIVE_QUERY_WEIGHT
+from tools.chunker import PARAGRAPH_BREAK, SENTENCE_END
+
+WORD = re.compile(r"[^\W\d_]{3,}")
+DIGITS = re.compile(r"\d+")
+# Markdown that never makes a good summary sentence: code, headings, tables and images
+CODE_BLOCK = re.compile(r"^```.*?^```[^\n]*$", re.M | re.S)
+NON_PROSE_LINE = re.compile(r"^(#{1,6} |\|).*$", re.M)
+IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+LIST_MARKER = re.compile(r"^\s*(?:[-*+]|\d+\.)\s+", re.M)
+MIN_SENTENCE_WORDS = 5
+STOPWORDS = set(
+    "about above after again against all also and any are because been before being "
+    "below between both but can could did does doing down during each few for from "
+    "further had has have having her here hers herself him himself his how into its "
+    "itself just more most much must nor not now off once only other our ours out over "
+    "own same she should some such than that the their theirs them then there these "
+    "they this those through too under until very was were what when where which "
+    "while who whom why will with would you your yours yourself".split()
+)
+
+
+def strip_markdown(text: str) -> str:
+    """
+    Reduce Markdown to its prose: drop code blocks, headings, tables, images and list
+    markers, and keep only the text of links.
+
+    Example:
+        >>> strip_markdown("# Title\\n\\nSee [the docs](https://x.org).\\n\\n```\\ncode\\n```")
+        '\\n\\nSee the docs.\\n\\n'
+    """
+    text = CODE_BLOCK.sub("", text)
+    text = NON_PROSE_LINE.sub("", text)
+    text = IMAGE.sub("", text)
+    text = LIST_MARKER.sub("", text)
+    return LINK.sub(r"\1", text)
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into whitespace-normalized sentences.
+
+    Example:
+        >>> split_sentences("First one. Second one!\\n\\nA new paragraph")
+        ['First one.', 'Second one!', 'A new paragraph']
+    """
+    sentences = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        for sentence in SENTENCE_END.split(paragraph.strip()):
+            sentence = " ".join(sentence.split())
+            if sentence:
+                sentences.append(sentence)
+    return sentences
+
+
+def _terms(text: str) -> List[str]:
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def score_sentences(sentences: List[str], query: str = None) -> np.ndarray:
+    """
+    Scores sentences by how close their TF-IDF vector is to the document centroid.
+
+    The term matrix is kept as coordinate arrays, so scoring is linear in the number of
+    words. With a query, the score is blended with the similarity to the query terms.
+    """
+    vocabulary = {}
+    rows, cols, counts = [], [], []
+    for i, sentence in enumerate(sentences):
+        for term, count in Counter(_terms(sentence)).items():
+            rows.append(i)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+
+    n = len(sentences)
+    if not rows:
+        return np.zeros(n)
+    rows = np.array(rows)
+    cols = np.array(cols)
+    size = len(vocabulary)
+
+    document_frequency = np.bincount(cols, minlength=size)
+    idf = np.log((1 + n) / (1 + document_frequency)) + 1
+    weights = (1 + np.log(np.array(counts, dtype=float))) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights**2, minlength=n))
+    weights /= norms[rows]
+
+    centroid = np.bincount(cols, weights, minlength=size) / n
+    centroid /= np.linalg.norm(centroid) or 1
+    scores = np.bincount(rows, weights * centroid[cols], minlength=n)
+
+    query_terms = [vocabulary[t] for t in set(_terms(query or "")) if t in vocabulary]
+    if query_terms:
+        query_vector = np.zeros(size)
+        query_vector[query_terms] = idf[query_terms]
+        query_vector /= np.linalg.norm(query_vector)
+        relevance = np.bincount(rows, weights * query_vector[cols], minlength=n)
+        scores = (
+            1 - EXTRACTIVE_QUERY_WEIGHT
+        ) * scores + EXTRACTIVE_QUERY_WEIGHT * relevance
+    return scores
+
+
+def extractive_summary(
+    text: str, query: str = None, sentences: int = EXTRACTIVE_SUMMARY_SENTENCES
+) -> str:
+    """
+    Summarizes text locally by picking its most central sentences, in document order.
+
+    The text is reduced to its prose first. Sentences that are too short to carry
+    content, and sentences repeated with at most different numbers, are left out of the
+    running. No model is called, so this returns in milliseconds and keeps working when
+    the OpenAI API is slow or down.
+    """
+    unique = {}
+    for sentence in split_sentences(strip_markdown(text)):
+        if len(sentence.split()) >= MIN_SENTENCE_WORDS:
+            unique.setdefault(DIGITS.sub("0", sentence.lower()), sentence)
+    candidates = list(unique.values())
+    if len(candidates) <= sentences:
+        return " ".join(candidates)
+
+    scores = score_sentences(candidates, query)
+    top = np.sort(np.argpartition(-scores, sentences - 1)[:sentences])
+    return " ".join(candidates[i] for i in top)
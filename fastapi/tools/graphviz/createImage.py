@@ -1,15 +1,15 @@
 import os
-import requests
 import uuid
 from constants import IMAGE_DIR
 from tools.graphviz.models import GraphvizRequest
 from tools.models import CommandResponse
 from tools.urlBuilder import urlFor, staticURL
+from tools.httpClient import getClient
 
 
-def createGraphViz(data: GraphvizRequest) -> CommandResponse:
+async def createGraphViz(data: GraphvizRequest) -> CommandResponse:
     try:
-        response = requests.post(
+        response = await getClient().post(
             "https://quickchart.io/graphviz",
             json={"graph": data.graph, "layout": data.layout.value, "format": "png"},
         )
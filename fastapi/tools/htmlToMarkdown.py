@@ -0,0 +1,224 @@
+import re
+import lxml.html
+from lxml import etree
+
+SKIP_TAGS = {
+    "head",
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "canvas",
+    "iframe",
+    "object",
+    "embed",
+    "button",
+    "input",
+    "select",
+    "textarea",
+}
+BLOCK_TAGS = {
+    "address",
+    "article",
+    "aside",
+    "body",
+    "center",
+    "dd",
+    "details",
+    "dialog",
+    "div",
+    "dl",
+    "dt",
+    "fieldset",
+    "figcaption",
+    "figure",
+    "footer",
+    "form",
+    "header",
+    "html",
+    "main",
+    "nav",
+    "p",
+    "section",
+    "summary",
+}
+HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+MAX_DEPTH = 400
+
+# Placeholder for meaningful indentation (nested lists, code) that survives line trimming
+INDENT = "\x00"
+WHITESPACE = re.compile(r"\s+")
+BLANK_LINES = re.compile(r"\n(\n)+")
+
+
+def parse_html(html):
+    """Parse an HTML document (str or bytes) into an lxml tree, or None if it is empty."""
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # Unicode strings with an XML encoding declaration must be parsed as bytes
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+
+def html_to_markdown(html) -> str:
+    """Convert an HTML document (str or bytes) to Markdown."""
+    tree = parse_html(html)
+    if tree is None:
+        return ""
+    return element_to_markdown(tree)
+
+
+def element_to_markdown(element) -> str:
+    """
+    Convert an already parsed lxml element to Markdown in a single walk of the tree.
+
+    Example:
+        >>> element_to_markdown(parse_html("<h1>Hi</h1><p>A <a href='/x'>link</a></p>"))
+        '# Hi\\n\\nA [link](/x)'
+    """
+    parts = []
+    _convert(element, parts, 0)
+    return tidy(parts).replace(INDENT, " ")
+
+
+def tidy(parts) -> str:
+    """Join converted parts, trim every line and collapse runs of blank lines."""
+    lines = [line.strip(" \t") for line in "".join(parts).split("\n")]
+    return BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _inline(element, depth) -> str:
+    parts = []
+    _convert_children(element, parts, depth)
+    return WHITESPACE.sub(" ", "".join(parts)).strip()
+
+
+def _convert_children(element, parts, depth):
+    if element.text:
+        parts.append(WHITESPACE.sub(" ", element.text))
+    for child in element:
+        _convert(child, parts, depth + 1)
+        if child.tail:
+            parts.append(WHITESPACE.sub(" ", child.tail))
+
+
+def _convert(element, parts, depth):
+    tag = element.tag
+    if not isinstance(tag, str):
+        # Comments and processing instructions
+        return
+    tag = tag.lower()
+
+    if tag in SKIP_TAGS:
+        return
+    if depth > MAX_DEPTH:
+        parts.append(WHITESPACE.sub(" ", element.text_content()))
+        return
+
+    if tag in HEADINGS:
+        text = _inline(element, depth)
+        if text:
+            parts.append(f"\n\n{'#' * HEADINGS[tag]} {text}\n\n")
+    elif tag == "a":
+        text = _inline(element, depth)
+        href = element.get("href")
+        if text and href and not href.startswith("javascript:"):
+            parts.append(f"[{text}]({href})")
+        else:
+            parts.append(text)
+    elif tag == "img":
+        src = element.get("src")
+        if src:
+            parts.append(f"![{element.get('alt', '').strip()}]({src})")
+    elif tag in ("strong", "b"):
+        text = _inline(element, depth)
+        if text:
+            parts.append(f"**{text}**")
+    elif tag in ("em", "i"):
+        text = _inline(element, depth)
+        if text:
+            parts.append(f"*{text}*")
+    elif tag == "code":
+        text = element.text_content()
+        if text.strip():
+            parts.append(f"`{text.strip()}`")
+    elif tag == "pre":
+        lines = element.text_content().expandtabs(4).strip("\n").split("\n")
+        code = "\n".join(
+            INDENT * (len(line) - len(line.lstrip(" "))) + line.lstrip(" ")
+            for line in lines
+        )
+        parts.append(f"\n\n```\n{code}\n```\n\n")
+    elif tag == "br":
+        parts.append("\n")
+    elif tag == "hr":
+        parts.append("\n\n---\n\n")
+    elif tag in ("ul", "ol"):
+        _convert_list(element, parts, depth, ordered=tag == "ol")
+    elif tag == "li":
+        # List items outside of a list
+        parts.append(f"\n- {_inline(element, depth)}\n")
+    elif tag == "blockquote":
+        inner = []
+        _convert_children(element, inner, depth)
+        quoted = tidy(inner)
+        if quoted:
+            lines = "\n".join(f"> {line}" for line in quoted.split("\n"))
+            parts.append(f"\n\n{lines}\n\n")
+    elif tag == "table":
+        _convert_table(element, parts, depth)
+    elif tag in BLOCK_TAGS:
+        parts.append("\n\n")
+        _convert_children(element, parts, depth)
+        parts.append("\n\n")
+    else:
+        _convert_children(element, parts, depth)
+
+
+def _convert_list(element, parts, depth, ordered):
+    parts.append("\n\n")
+    index = 1
+    for item in element:
+        if not isinstance(item.tag, str) or item.tag.lower() != "li":
+            continue
+
+        inner = []
+        _convert_children(item, inner, depth + 1)
+        text = tidy(inner)
+        if not text:
+            continue
+
+        marker = f"{index}. " if ordered else "- "
+        indent = INDENT * len(marker)
+        lines = text.split("\n")
+        parts.append(marker + lines[0] + "\n")
+        for line in lines[1:]:
+            parts.append((indent + line if line else "") + "\n")
+        index += 1
+    parts.append("\n")
+
+
+def _convert_table(element, parts, depth):
+    rows = []
+    for row in element.iter("tr"):
+        cells = [
+            _inline(cell, depth).replace("|", "\\|")
+            for cell in row
+            if isinstance(cell.tag, str) and cell.tag.lower() in ("td", "th")
+        ]
+        if cells:
+            rows.append(cells)
+    if not rows:
+        return
+
+    width = max(len(row) for row in rows)
+    lines = []
+    for i, row in enumerate(rows):
+        row = row + [""] * (width - len(row))
+        lines.append("| " + " | ".join(row) + " |")
+        if i == 0:
+            lines.append("|" + " --- |" * width)
+    parts.append("\n\n" + "\n".join(lines) + "\n\n")
@@ -0,0 +1,46 @@
+import os
+import httpx
+from constants import (
+    HTTP_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+)
+
+# App-wide async client, created lazily on first use so it binds to the running event loop
+_client: httpx.AsyncClient = None
+
+
+def getClient() -> httpx.AsyncClient:
+    """
+    Returns the shared async HTTP client used for every outbound call in the tools package.
+
+    The client keeps a keep-alive connection pool per host, so repeated calls to the same
+    origin (quickchart.io, mermaid.ink, the search engine, crawled sites) reuse the TLS
+    connection instead of paying for a new handshake each time.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        headers = {}
+        if os.environ.get("USER_AGENT"):
+            headers["User-Agent"] = os.environ["USER_AGENT"]
+
+        _client = httpx.AsyncClient(
+            headers=headers,
+            follow_redirects=True,
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+async def closeClient():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,22 @@
+import hashlib
+import json
+from constants import CACHE_DIR, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES
+from tools.diskCache import DiskCache
+
+# Chat completions keyed by a hash of the model, sampling parameters and prompt
+llmCache = DiskCache("llm", CACHE_DIR, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL)
+
+
+def prompt_key(model: str, temperature: float, messages: list, **params) -> str:
+    """
+    Cache key of a chat completion request.
+
+    Example:
+        >>> prompt_key("gpt-4o", 0.7, [{"role": "user", "content": "Hi"}])[:16]
+        '50a52911d188db36'
+    """
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": messages, **params},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
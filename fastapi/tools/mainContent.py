@@ -0,0 +1,266 @@
+import copy
+import heapq
+import re
+from tools.htmlToMarkdown import SKIP_TAGS
+
+# Class and id hints, as used by Readability
+UNLIKELY = re.compile(
+    r"-ad-|ai2html|banner|breadcrumb|combx|comment|community|cover-wrap|cookie|consent"
+    r"|disqus|extra|footer|gdpr|header|legends|menu|related|remark|replies|rss|shoutbox"
+    r"|sidebar|skyscraper|social|sponsor|supplemental|ad-break|agegate|pagination|pager"
+    r"|popup|yom-remote|newsletter|subscribe|share|modal|promo|navbar|nav-",
+    re.I,
+)
+MAYBE_CANDIDATE = re.compile(r"and|article|body|column|content|main|shadow", re.I)
+POSITIVE = re.compile(
+    r"article|body|content|entry|hentry|h-entry|main|page|pagination|post|text|blog|story",
+    re.I,
+)
+NEGATIVE = re.compile(
+    r"-ad-|hidden|^hid$| hid$| hid |^hid |banner|combx|comment|com-|contact|footer|gdpr"
+    r"|masthead|media|meta|outbrain|promo|related|scroll|share|shoutbox|sidebar|skyscraper"
+    r"|sponsor|shopping|tags|widget|cookie|consent|newsletter|subscribe|social|nav",
+    re.I,
+)
+
+BOILERPLATE_TAGS = {"nav", "aside", "footer", "form", "menu", "dialog"}
+PARAGRAPH_TAGS = {"p", "pre", "td", "blockquote"}
+TAG_WEIGHTS = {
+    "article": 10,
+    "main": 10,
+    "div": 5,
+    "section": 3,
+    "pre": 3,
+    "td": 3,
+    "blockquote": 3,
+    "address": -3,
+    "ol": -3,
+    "ul": -3,
+    "dl": -3,
+    "dd": -3,
+    "dt": -3,
+    "li": -3,
+    "form": -3,
+    "h1": -5,
+    "h2": -5,
+    "h3": -5,
+    "h4": -5,
+    "h5": -5,
+    "h6": -5,
+    "th": -5,
+}
+MIN_PARAGRAPH_LENGTH = 25
+TOP_CANDIDATES = 5
+# Below this much text the extraction is assumed to have failed
+MIN_CONTENT_LENGTH = 250
+
+
+def _tag(element) -> str:
+    tag = element.tag
+    return tag.lower() if isinstance(tag, str) else ""
+
+
+def _hints(element) -> str:
+    return f"{element.get('class', '')} {element.get('id', '')}"
+
+
+def class_weight(element) -> int:
+    hints = _hints(element)
+    weight = 0
+    if NEGATIVE.search(hints):
+        weight -= 25
+    if POSITIVE.search(hints):
+        weight += 25
+    return weight
+
+
+def _is_unlikely(element, tag: str) -> bool:
+    if tag in BOILERPLATE_TAGS or element.get("aria-hidden") == "true":
+        return True
+    if element.get("role") in ("navigation", "complementary", "dialog", "banner"):
+        return True
+    hints = _hints(element)
+    return bool(
+        UNLIKELY.search(hints)
+        and not MAYBE_CANDIDATE.search(hints)
+        and tag not in ("body", "article", "main", "a")
+    )
+
+
+def _text_length(element) -> int:
+    return len(" ".join(element.text_content().split()))
+
+
+def _own_text_length(element) -> int:
+    """Length of the text directly inside an element, not inside its children."""
+    text = element.text or ""
+    for child in element:
+        text += child.tail or ""
+    return len(text.strip())
+
+
+def link_density(element, length: int = None) -> float:
+    """Share of the text of an element that sits inside links."""
+    if length is None:
+        length = _text_length(element)
+    if not length:
+        return 0.0
+    linked = sum(_text_length(a) for a in element.iter("a"))
+    return min(linked / length, 1.0)
+
+
+def text_density(element, length: int = None) -> float:
+    """Characters of text per element in the subtree."""
+    if length is None:
+        length = _text_length(element)
+    tags = sum(1 for e in element.iter() if isinstance(e.tag, str))
+    return length / max(tags, 1)
+
+
+def _paragraphs(root):
+    """Paragraph-like elements outside of skipped and unlikely subtrees."""
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        tag = _tag(element)
+        if not tag or tag in SKIP_TAGS:
+            continue
+        if element is not root and _is_unlikely(element, tag):
+            continue
+
+        if tag in PARAGRAPH_TAGS:
+            yield element
+            if tag != "td":
+                continue
+        elif tag in ("div", "section") and _own_text_length(element) >= (
+            MIN_PARAGRAPH_LENGTH
+        ):
+            # Text placed directly in a div reads as a paragraph of its own
+            yield element
+        stack.extend(reversed(element))
+
+
+def _score_candidates(root) -> dict:
+    scores = {}
+    for paragraph in _paragraphs(root):
+        length = (
+            _own_text_length(paragraph)
+            if _tag(paragraph) in ("div", "section")
+            else _text_length(paragraph)
+        )
+        if length < MIN_PARAGRAPH_LENGTH:
+            continue
+
+        text = paragraph.text_content()
+        score = 1 + text.count(",") + min(length // 100, 3)
+
+        # Readability style propagation: the parent gets the full score, the
+        # grandparent half of it and the great-grandparent a sixth
+        ancestor = paragraph.getparent()
+        level = 0
+        while ancestor is not None and level < 3:
+            if ancestor not in scores:
+                tag = _tag(ancestor)
+                scores[ancestor] = TAG_WEIGHTS.get(tag, 0) + class_weight(ancestor)
+            divider = 1 if level == 0 else 2 if level == 1 else level * 3
+            scores[ancestor] += score / divider
+            if ancestor is root:
+                break
+            ancestor = ancestor.getparent()
+            level += 1
+    return scores
+
+
+def _is_content_sibling(sibling, top, threshold, scores) -> bool:
+    if sibling is top:
+        return True
+    bonus = 0
+    if top.get("class") and sibling.get("class") == top.get("class"):
+        bonus = scores.get(top, 0) * 0.2
+    if scores.get(sibling, -1000) + bonus >= threshold:
+        return True
+    if _tag(sibling) == "p":
+        length = _text_length(sibling)
+        density = link_density(sibling, length)
+        if length > 80 and density < 0.25:
+            return True
+        if (
+            0 < length <= 80
+            and density == 0
+            and sibling.text_content().rstrip()[-1:] in ".!?"
+        ):
+            return True
+    return False
+
+
+def _clean(container):
+    """Drop blocks inside the extracted content that still look like boilerplate."""
+    stack = list(container)
+    while stack:
+        element = stack.pop()
+        tag = _tag(element)
+        if not tag or tag in SKIP_TAGS:
+            continue
+
+        if _is_unlikely(element, tag) or class_weight(element) < 0:
+            element.drop_tree()
+            continue
+        if tag in ("div", "section", "ul", "ol", "table", "header") and (
+            element.find(".//pre") is None and element.find(".//img") is None
+        ):
+            length = _text_length(element)
+            density = link_density(element, length)
+            if density > 0.5 or (density > 0.25 and text_density(element, length) < 10):
+                element.drop_tree()
+                continue
+        stack.extend(element)
+
+
+def extract_main_content(root):
+    """
+    Find the element holding the main content of a page and return a cleaned copy of it.
+
+    Paragraph-like blocks are scored by their amount of text and number of commas,
+    and their scores are propagated to their ancestors, so the container holding the
+    most running text wins. Candidate scores are discounted by their link density,
+    which pushes navigation bars, link lists and footers out of the running. Siblings
+    of the winner that look like content are kept alongside it, and blocks within the
+    result that are mostly links are dropped. The tree that is passed in is not modified.
+
+    Returns None when nothing scores or too little text is left, so callers can fall
+    back to the full page.
+    """
+    scores = _score_candidates(root)
+    if not scores:
+        return None
+
+    candidates = heapq.nlargest(TOP_CANDIDATES, scores.items(), key=lambda i: i[1])
+    top, best = None, float("-inf")
+    for element, score in candidates:
+        score *= 1 - link_density(element)
+        scores[element] = score
+        if score > best:
+            top, best = element, score
+
+    parent = top.getparent()
+    wrapper = top.makeelement("div", {})
+    if parent is None or top is root:
+        wrapper.append(copy.deepcopy(top))
+    else:
+        threshold = max(10, best * 0.2)
+        for sibling in parent:
+            if _tag(sibling) and _is_content_sibling(sibling, top, threshold, scores):
+                wrapper.append(copy.deepcopy(sibling))
+                # The tail is text of the parent, not of the sibling
+                wrapper[-1].tail = None
+
+    _clean(wrapper)
+    if _text_length(wrapper) < MIN_CONTENT_LENGTH:
+        return None
+    return wrapper
+
+
+def main_content_or_full(root):
+    """The extracted main content of a page, or the page itself when there is none."""
+    main = extract_main_content(root)
+    return root if main is None else main
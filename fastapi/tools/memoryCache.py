@@ -0,0 +1,74 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable
+
+
+class MemoryCache:
+    """
+    In-process LRU cache that serves stale entries while it revalidates them.
+
+    An entry younger than the TTL is served as is. An older one is still served for up
+    to stale_ttl more seconds, while a background task fetches a fresh value. Past that
+    it is fetched again before returning. Concurrent fetches of the same key share one
+    call, and a failed background refresh keeps the stale value.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.counters = Counter()
+        self._entries = OrderedDict()
+        self._fetches = {}
+
+    def count(self, counter: str):
+        self.counters[counter] += 1
+
+    def put(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _fetch(self, key: str, fetch: Callable[[], Awaitable]) -> asyncio.Task:
+        task = self._fetches.get(key)
+        if task is None:
+
+            async def run():
+                value = await fetch()
+                self.put(key, value)
+                return value
+
+            task = asyncio.ensure_future(run())
+            self._fetches[key] = task
+            task.add_done_callback(lambda _: self._fetches.pop(key, None))
+        return task
+
+    def _refreshed(self, task: asyncio.Task):
+        if task.cancelled() or task.exception() is not None:
+            self.counters["refresh_errors"] += 1
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self.counters["hits"] += 1
+                self._entries.move_to_end(key)
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self.counters["stale_hits"] += 1
+                self._entries.move_to_end(key)
+                if key not in self._fetches:
+                    self.counters["refreshes"] += 1
+                    self._fetch(key, fetch).add_done_callback(self._refreshed)
+                return entry[1]
+
+        self.counters["misses"] += 1
+        # A caller going away must not cancel the fetch for the others waiting on it
+        return await asyncio.shield(self._fetch(key, fetch))
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), **self.counters}
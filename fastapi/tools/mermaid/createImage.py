@@ -2,21 +2,22 @@ from PIL import Image
 import base64
 import os
 import io
-import requests
 import uuid
 from constants import IMAGE_DIR
 from tools.models import CommandResponse
 from tools.urlBuilder import urlFor, staticURL
+from tools.httpClient import getClient
 
 
-def createMermaidDiagram(mermaidGraph):
+async def createMermaidDiagram(mermaidGraph):
     try:
         graphbytes = mermaidGraph.encode("ascii")
 
         base64_bytes = base64.b64encode(graphbytes)
         base64_string = base64_bytes.decode("ascii")
 
-        rawImage = requests.get("https://mermaid.ink/img/" + base64_string).content
+        response = await getClient().get("https://mermaid.ink/img/" + base64_string)
+        rawImage = response.content
         imageFile = Image.open(io.BytesIO(rawImage))
 
         print("Saving Image")
@@ -1,3 +1,4 @@
+from enum import Enum
 from pydantic import BaseModel
 
 
@@ -12,3 +13,18 @@ class CommandResponse(BaseModel):
                 "output": "Image Generated",
             }
         }
+
+
+class ContentMode(str, Enum):
+    main = "main"  # Only the main content, without navigation and boilerplate
+    full = "full"  # Everything in the page body
+
+
+class SummarizeMode(str, Enum):
+    abstractive = "abstractive"  # Summary written by the LLM
+    extractive = "extractive"  # Most central sentences, picked locally without the LLM
+
+
+class StreamFormat(str, Enum):
+    ndjson = "ndjson"  # One JSON object per line
+    sse = "sse"  # Server-Sent Events
@@ -1,19 +1,241 @@
-from retry import retry
-from constants import MAX_CONTEXT_WINDOW, SUMMARIZE_MODEL, JSON_MODEL
+import asyncio
+from constants import (
+    SUMMARIZE_MODEL,
+    JSON_MODEL,
+    SUMMARIZE_CHUNK_TOKENS,
+    SUMMARIZE_CONCURRENCY,
+    SUMMARIZE_MAX_REDUCE_LEVELS,
+    OPENAI_MAX_RETRIES,
+    OPENAI_TIMEOUT,
+)
+from tools.chunker import split_into_chunks, count_tokens
+from tools.entityExtraction import parse_entities, response_format, merge_entities
+from tools.extractiveSummary import extractive_summary, strip_markdown
+from tools.models import SummarizeMode
+from tools.llmCache import llmCache, prompt_key
+from tools.rateLimiter import Priority, getLimiter
+from tools.textCleaner import clean_texts
+from tools.threadingUtils import run_in_threadpool
 import os
-from openai import OpenAI
-import re
-from html import unescape
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, RateLimitError
 import json
 from fastapi import HTTPException
 
-client = OpenAI(
-    api_key=os.environ.get("OPENAI_API_KEY"),
-)
+# App-wide async client, created lazily on first use so it binds to the running event loop
+_client: AsyncOpenAI = None
+
+# Upstream calls in flight, by prompt key, so identical prompts share one request
+_inflight = {}
+
+# Length limit of each summary, which also bounds what a round of summaries adds up to
+SUMMARY_MAX_TOKENS = 500
+
+
+def getOpenAIClient() -> AsyncOpenAI:
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            timeout=OPENAI_TIMEOUT,
+            # Retries go through the rate limiter instead, see _complete
+            max_retries=0,
+        )
+    return _client
+
+
+async def closeOpenAIClient():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def retry_after(error: APIStatusError, attempt: int) -> float:
+    """Seconds to wait before retrying, from the response headers or an exponential backoff."""
+    headers = error.response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return min(2**attempt, 60)
+
+
+def _reservation(messages, max_tokens) -> int:
+    prompt = "\n".join(message["content"] for message in messages)
+    return count_tokens(prompt) + max_tokens
+
+
+async def _request(limiter, reserved, priority, **kwargs):
+    """
+    Sends one chat completion request once the rate limiter admits it.
+
+    Rate limits, connection errors and 5xx responses are retried. On success the
+    reservation is still held; the caller settles it once the usage is known.
+    """
+    for attempt in range(OPENAI_MAX_RETRIES + 1):
+        await limiter.acquire(reserved, priority)
+        try:
+            return await getOpenAIClient().chat.completions.create(**kwargs)
+        except (RateLimitError, APIConnectionError, APIStatusError) as e:
+            limiter.settle(reserved, 0)
+            transient = isinstance(e, (RateLimitError, APIConnectionError)) or (
+                e.status_code >= 500
+            )
+            if not transient or attempt == OPENAI_MAX_RETRIES:
+                raise
+            delay = (
+                retry_after(e, attempt)
+                if isinstance(e, APIStatusError)
+                else min(2**attempt, 60)
+            )
+            print(
+                f"{kwargs['model']} call failed ({e.__class__.__name__}), retrying in {delay}s"
+            )
+            if isinstance(e, RateLimitError):
+                # Hold back every call to this model, not just this one
+                limiter.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+        except BaseException:
+            limiter.settle(reserved, 0)
+            raise
+
+
+async def _complete(messages, model, temperature, max_tokens, priority, extra):
+    """One upstream chat completion, paced by the rate limiter of the model."""
+    limiter = getLimiter(model)
+    reserved = _reservation(messages, max_tokens)
+    response = await _request(
+        limiter,
+        reserved,
+        priority,
+        messages=messages,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        **extra,
+    )
+    used = response.usage.total_tokens if response.usage else reserved
+    limiter.settle(reserved, used)
+    return response.choices[0].message.content
+
 
+async def _stream(messages, model, temperature, max_tokens, priority):
+    """Like _complete, but yields the content as the model generates it."""
+    limiter = getLimiter(model)
+    reserved = _reservation(messages, max_tokens)
+    response = await _request(
+        limiter,
+        reserved,
+        priority,
+        messages=messages,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    used = reserved
+    try:
+        async for chunk in response:
+            if chunk.usage:
+                used = chunk.usage.total_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        limiter.settle(reserved, used)
+        await response.close()
+
+
+async def chat_completion(
+    messages,
+    model,
+    temperature,
+    max_tokens,
+    use_cache=True,
+    parse=None,
+    priority=Priority.interactive,
+    response_format=None,
+):
+    """
+    Runs a chat completion through the LLM cache and returns the message content.
+
+    Identical requests (same model, temperature, max_tokens, response_format and
+    messages) are answered from the cache while the entry is fresh, and share a single
+    upstream call while one is in flight. With parse set, the content is parsed before it is stored, so a
+    response that fails to parse is never cached. Passing use_cache=False neither reads
+    nor writes the cache.
+    """
+    extra = {"response_format": response_format} if response_format else {}
+    key = prompt_key(model, temperature, messages, max_tokens=max_tokens, **extra)
+    if use_cache:
+        entry = await run_in_threadpool(llmCache.get, key)
+        if entry and entry.fresh:
+            llmCache.count("hits")
+            content = entry.data["content"]
+            return parse(content) if parse else content
+        llmCache.count("misses")
+    else:
+        llmCache.count("bypasses")
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _complete(messages, model, temperature, max_tokens, priority, extra)
+        )
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        llmCache.count("coalesced")
+
+    # A caller going away must not cancel the call for the others waiting on it
+    content = await asyncio.shield(task)
+    result = parse(content) if parse else content
+    if use_cache and content is not None:
+        await run_in_threadpool(llmCache.put, key, {"content": content, "model": model})
+    return result
+
+
+async def stream_chat_completion(
+    messages,
+    model,
+    temperature,
+    max_tokens,
+    use_cache=True,
+    priority=Priority.interactive,
+):
+    """
+    Yields the content of a chat completion as it is generated.
+
+    A fresh cache entry is yielded in one piece. Otherwise the completion is streamed
+    from upstream and cached once it is complete. Streams are not coalesced with
+    identical calls in flight, since each caller needs its own tokens.
+    """
+    key = prompt_key(model, temperature, messages, max_tokens=max_tokens)
+    if use_cache:
+        entry = await run_in_threadpool(llmCache.get, key)
+        if entry and entry.fresh:
+            llmCache.count("hits")
+            yield entry.data["content"]
+            return
+        llmCache.count("misses")
+    else:
+        llmCache.count("bypasses")
+
+    parts = []
+    async for token in _stream(messages, model, temperature, max_tokens, priority):
+        parts.append(token)
+        yield token
+    if use_cache:
+        await run_in_threadpool(
+            llmCache.put, key, {"content": "".join(parts), "model": model}
+        )
 
-def summarizeOpenAI(query, text, entities):
 
+def summary_messages(query, text, entities):
     content = f"You are a helpful assistant. Write a concise summary of the following text in English: {text}."
     if query:
         content = f"You are a helpful assistant that summarizes the following text in English. The summary should be concise and accurate. Do not include any information that is not relevant to the query. If the text is not relevant to the query, return an empty string. The query is: {query}. The text is: {text}."
@@ -22,102 +244,282 @@ def summarizeOpenAI(query, text, entities):
         content = f"You are a helpful assistant. Write a concise summary of the following text in English: {text}. Data points to focus on while summarizing are {entities}. Ensure that the summary is accurate and provides a clear overview of the information presented in the original text."
         if query:
             content = f"You are a helpful assistant that summarizes the following text in English. The summary should be concise and accurate. Do not include any information that is not relevant to the query. If the text is not relevant to the query, return an empty string. Data points to focus on while summarizing are {entities}. Ensure that the summary is accurate and provides a clear overview of the information presented in the original text. The query is: {query}. The text is: {text}."
-    response = client.chat.completions.create(
-        messages=[{"role": "user", "content": content}],
+    return [{"role": "user", "content": content}]
+
+
+async def summarizeOpenAI(
+    query, text, entities, use_cache=True, priority=Priority.interactive
+):
+    return await chat_completion(
+        messages=summary_messages(query, text, entities),
         model=SUMMARIZE_MODEL,
         temperature=0.7,
-        max_tokens=500,
+        max_tokens=SUMMARY_MAX_TOKENS,
+        use_cache=use_cache,
+        priority=priority,
+    )
+
+
+def streamSummarizeOpenAI(
+    query, text, entities, use_cache=True, priority=Priority.interactive
+):
+    return stream_chat_completion(
+        messages=summary_messages(query, text, entities),
+        model=SUMMARIZE_MODEL,
+        temperature=0.7,
+        max_tokens=SUMMARY_MAX_TOKENS,
+        use_cache=use_cache,
+        priority=priority,
     )
-    return response.choices[0].message.content
 
 
 def split_text_into_chunks(text):
-    # Split the text into manageable chunks without breaking sentences
-    words = text.split()
-    chunks = []
-    current_chunk = []
+    # Split the text into chunks that fit the context window of the summarize model,
+    # without breaking sentences
+    return split_into_chunks(text)
 
-    for word in words:
-        if len(" ".join(current_chunk + [word])) <= MAX_CONTEXT_WINDOW:
-            current_chunk.append(word)
-        else:
-            chunks.append(" ".join(current_chunk))
-            current_chunk = [word]
 
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
+def chunk_and_clean(text):
+    # Chunk before cleaning, which flattens the paragraph breaks the chunker keeps
+    return clean_texts(split_text_into_chunks(text), True)
 
-    return chunks
 
+async def summarize_chunks(
+    query, chunks, entities=None, use_cache=True, priority=Priority.interactive
+):
+    """Summarizes chunks concurrently, returning the summaries in chunk order."""
+    semaphore = asyncio.Semaphore(SUMMARIZE_CONCURRENCY)
 
-def clean_text(text, remove_images=True):
-    try:
-        # Strip HTML tags
-        try:
-            text = re.sub(r"<[^>]+>", "", text)
-        except Exception as e:
-            print(f"Error stripping HTML tags: {e}")
+    async def summarize(chunk):
+        async with semaphore:
+            return await summarizeOpenAI(query, chunk, entities, use_cache, priority)
 
-        # Convert HTML entities to their corresponding characters
-        try:
-            text = unescape(text)
-        except Exception as e:
-            print(f"Error unescaping HTML entities: {e}")
-
-        # Remove image URLs
-        if remove_images:
-            try:
-                text = re.sub(
-                    r"https?://[\w\.-]+/\S+\.(jpg|jpeg|png|gif|bmp)(\?\S*)?", "", text
-                )
-            except Exception as e:
-                print(f"Error removing image URLs: {e}")
-
-        # Replace multiple spaces with a single space and trim leading/trailing spaces
-        try:
-            text = re.sub(r"\s+", " ", text).strip()
-        except Exception as e:
-            print(f"Error replacing multiple spaces: {e}")
+    return await asyncio.gather(*[summarize(chunk) for chunk in chunks])
 
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
 
-    return text
+async def map_reduce_summary(
+    query, text, entities=None, use_cache=True, priority=Priority.interactive
+):
+    """
+    Summarizes text of any length in about as many round trips as the tree is deep.
 
+    The chunks are summarized in parallel (map). While the joined summaries are still
+    larger than one chunk, they are grouped into chunks and summarized again (reduce),
+    so a long page costs one or two rounds of wall-clock time instead of one per chunk.
+    """
+    chunks = await run_in_threadpool(chunk_and_clean, text)
+    summaries = await summarize_chunks(query, chunks, entities, use_cache, priority)
+
+    for _ in range(SUMMARIZE_MAX_REDUCE_LEVELS):
+        combined = "\n\n".join(summaries)
+        if len(summaries) <= 1 or count_tokens(combined) <= SUMMARIZE_CHUNK_TOKENS:
+            break
+        print(f"Reducing {len(summaries)} summaries")
+        summaries = await summarize_chunks(
+            query,
+            split_into_chunks(combined, overlap=0),
+            entities,
+            use_cache,
+            priority,
+        )
+    return " ".join((summary or "").strip() for summary in summaries)
 
-def process_search_results(query, parsed_content, entities=None):
-    text_chunks = split_text_into_chunks(clean_text(parsed_content, True))
-    summarized_content = ""
-    for chunk in text_chunks:
-        summary = summarizeOpenAI(query, chunk, entities)
-        summarized_content += summary + " "
-    if entities and entities != "":
-        try:
-            return jsonOpenAI(summarized_content, entities)
-        except Exception as e:
-            print(f"Error creating JSON: {e}")
-            return HTTPException(status_code=500, detail="Error creating JSON")
-    return summarized_content.strip()
 
+def summarize_extractive(query, text):
+    # Drop code and headings while the Markdown line structure is still there, then
+    # clean line by line so that list items and paragraphs do not run into each other
+    lines = clean_texts(strip_markdown(text).splitlines(), True)
+    return extractive_summary("\n\n".join(lines), query)
 
-@retry(tries=3, delay=2, backoff=2)
-def jsonOpenAI(response, entities):
-    print(f"Json OpenAI {response}")
-    response = client.chat.completions.create(
+
+async def extract_chunk(
+    query, chunk, template, use_cache=True, priority=Priority.interactive
+):
+    """
+    Extracts the fields of the template from one chunk as a JSON object.
+
+    Transient API errors are retried by _request; anything else fails the chunk.
+    """
+    content = f"Extract the following fields from the text: {json.dumps(template)}. Use null for fields the text does not mention and do not make up values."
+    if query:
+        content += f" The fields relate to the query: {query}."
+    return await chat_completion(
         messages=[
-            {
-                "role": "system",
-                "content": f"Your task is to take the unstructured text provided and convert it into a well-organized table format using JSON. Keys in the JSON object should be {entities}. Extract the relevant information from the text and populate the corresponding values in the JSON object. Ensure that the data is accurately represented and properly formatted within the JSON structure. The resulting JSON table should provide a clear, structured overview of the information presented in the original text. Do not add any new keys.",
-            },
-            {
-                "role": "user",
-                "content": f"Do not respond in Markdown. The text is: {response}",
-            },
+            {"role": "system", "content": content},
+            {"role": "user", "content": f"The text is: {chunk}"},
         ],
         model=JSON_MODEL,
-        temperature=0.7,
+        temperature=0,
         max_tokens=500,
+        use_cache=use_cache,
+        parse=json.loads,
+        priority=priority,
+        response_format=response_format(template),
     )
-    print("Json Response")
-    print(response.choices[0].message.content)
-    return str(json.loads(response.choices[0].message.content))
+
+
+async def extract_entities(
+    query, text, entities, use_cache=True, priority=Priority.interactive
+):
+    """
+    Extracts the requested entities from text of any length in one parallel round.
+
+    Every chunk is asked for the fields directly, with the response constrained to a
+    JSON schema of the template, and the per-chunk objects are merged in Python. Chunks
+    whose extraction fails are left out; only when all of them fail is the error raised.
+    """
+    template = parse_entities(entities)
+    chunks = await run_in_threadpool(chunk_and_clean, text)
+    semaphore = asyncio.Semaphore(SUMMARIZE_CONCURRENCY)
+
+    async def extract(chunk):
+        async with semaphore:
+            return await extract_chunk(query, chunk, template, use_cache, priority)
+
+    results = await asyncio.gather(
+        *[extract(chunk) for chunk in chunks], return_exceptions=True
+    )
+    objects = [result for result in results if isinstance(result, dict)]
+    failed = [result for result in results if isinstance(result, Exception)]
+    if failed:
+        print(f"Entity extraction failed for {len(failed)} of {len(chunks)} chunks")
+        if not objects:
+            raise failed[0]
+    return str(merge_entities(template, objects))
+
+
+async def process_search_results(
+    query,
+    parsed_content,
+    entities=None,
+    use_cache=True,
+    priority=Priority.interactive,
+    mode=SummarizeMode.abstractive,
+):
+    if entities and entities != "":
+        # Extract the entities straight from the content, without summarizing it first.
+        # In extractive mode the local extract is small and usually fits one call.
+        if mode == SummarizeMode.extractive:
+            parsed_content = await run_in_threadpool(
+                summarize_extractive, query, parsed_content
+            )
+        try:
+            return await extract_entities(
+                query, parsed_content, entities, use_cache, priority
+            )
+        except Exception as e:
+            print(f"Error creating JSON: {e}")
+            return HTTPException(status_code=500, detail="Error creating JSON")
+
+    if mode == SummarizeMode.extractive:
+        return await run_in_threadpool(summarize_extractive, query, parsed_content)
+    return await map_reduce_summary(query, parsed_content, None, use_cache, priority)
+
+
+async def _stream_in_order(query, chunks, use_cache, priority, summaries):
+    """
+    Summarizes chunks concurrently, yielding ("token", ...) events in chunk order.
+
+    Tokens of the first unfinished chunk are forwarded as they arrive and those of
+    later chunks are held back until it is done, so the text reads like the joined
+    summaries. A ("progress", ...) event follows every finished chunk. The complete
+    summaries are written to `summaries`.
+    """
+    queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(SUMMARIZE_CONCURRENCY)
+
+    async def pump(i, chunk):
+        try:
+            async with semaphore:
+                async for token in streamSummarizeOpenAI(
+                    query, chunk, None, use_cache, priority
+                ):
+                    queue.put_nowait((i, token))
+            queue.put_nowait((i, None))
+        except Exception as e:
+            queue.put_nowait((i, e))
+
+    tasks = [asyncio.ensure_future(pump(i, chunk)) for i, chunk in enumerate(chunks)]
+    parts = [[] for _ in chunks]
+    finished = [False] * len(chunks)
+    done = 0
+    current = 0
+    try:
+        while current < len(chunks):
+            i, item = await queue.get()
+            if isinstance(item, Exception):
+                raise item
+            if item is None:
+                finished[i] = True
+                done += 1
+                yield "progress", {"done": done, "total": len(chunks)}
+            else:
+                parts[i].append(item)
+                if i == current:
+                    yield "token", {"text": item}
+
+            while current < len(chunks) and finished[current]:
+                summaries[current] = "".join(parts[current])
+                current += 1
+                if current < len(chunks):
+                    yield "token", {"text": " " + "".join(parts[current])}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def stream_summary(
+    query,
+    parsed_content,
+    entities=None,
+    use_cache=True,
+    priority=Priority.interactive,
+    mode=SummarizeMode.abstractive,
+):
+    """
+    Streaming counterpart of process_search_results.
+
+    Yields ("progress", ...) events as the chunks of each round are summarized,
+    ("token", ...) events with the text of the last round as the model writes it, and
+    finally a ("result", ...) event with the complete output. Extractive summaries and
+    entities are not written token by token, so they only produce the result. When the
+    entities cannot be extracted, an ("error", ...) event takes the place of the result.
+    """
+    if (entities and entities != "") or mode == SummarizeMode.extractive:
+        content = await process_search_results(
+            query, parsed_content, entities, use_cache, priority, mode
+        )
+        if isinstance(content, HTTPException):
+            yield "error", {"detail": content.detail}
+            return
+        yield "result", {"content": content}
+        return
+
+    chunks = await run_in_threadpool(chunk_and_clean, parsed_content)
+    for level in range(SUMMARIZE_MAX_REDUCE_LEVELS + 1):
+        stage = "map" if level == 0 else "reduce"
+        # The round is the last one when its summaries are bound to fit in one chunk
+        last = level == SUMMARIZE_MAX_REDUCE_LEVELS or (
+            len(chunks) * (SUMMARY_MAX_TOKENS + 2) <= SUMMARIZE_CHUNK_TOKENS
+        )
+        summaries = [None] * len(chunks)
+        async for event, data in _stream_in_order(
+            query, chunks, use_cache, priority, summaries
+        ):
+            if event == "progress":
+                yield event, {"stage": stage, "round": level, **data}
+            elif last:
+                yield event, data
+        if last:
+            break
+
+        combined = "\n\n".join(summaries)
+        if len(summaries) <= 1 or count_tokens(combined) <= SUMMARIZE_CHUNK_TOKENS:
+            # Shorter than expected, so this was the last round after all
+            yield "token", {"text": " ".join(s.strip() for s in summaries)}
+            break
+        print(f"Reducing {len(summaries)} summaries")
+        chunks = split_into_chunks(combined, overlap=0)
+
+    content = " ".join((summary or "").strip() for summary in summaries)
+    yield "result", {"content": content}
@@ -6,9 +6,10 @@ import uuid
 from constants import IMAGE_DIR
 from tools.models import CommandResponse
 from tools.urlBuilder import urlFor, staticURL
+from tools.httpClient import getClient
 
 
-def createPlantUML(plantumlText):
+async def createPlantUML(plantumlText):
     try:
         # create a server object to call for your computations
         print("Calling PlantUML Server")
@@ -20,8 +21,10 @@ def createPlantUML(plantumlText):
             request_opts={},
         )
 
-        # Send and compile your diagram files to/with the PlantUML server
-        rawImage = server.processes(plantumlText)
+        # Encode the diagram into a server URL and fetch it through the shared client
+        response = await getClient().get(server.get_url(plantumlText))
+        response.raise_for_status()
+        rawImage = response.content
         imageStream = io.BytesIO(rawImage)
         imageFile = Image.open(imageStream)
 
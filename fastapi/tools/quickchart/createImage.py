@@ -1,15 +1,15 @@
 import os
-import requests
 import uuid
 from constants import IMAGE_DIR
 from tools.quickchart.models import QuickChartRequest
 from tools.models import CommandResponse
 from tools.urlBuilder import urlFor, staticURL
+from tools.httpClient import getClient
 
 
-def createQuickCharts(data: QuickChartRequest) -> CommandResponse:
+async def createQuickCharts(data: QuickChartRequest) -> CommandResponse:
     try:
-        response = requests.get(
+        response = await getClient().get(
             "https://quickchart.io/chart",
             params={
                 "backgroundColor": data.backgroundColor,
@@ -0,0 +1,137 @@
+import asyncio
+import heapq
+import itertools
+from enum import IntEnum
+from constants import OPENAI_RATE_LIMITS, OPENAI_DEFAULT_RATE_LIMIT
+
+
+class Priority(IntEnum):
+    interactive = 0  # A caller is waiting on this one result
+    bulk = 1  # Part of a larger job such as a crawl
+
+
+class TokenBucket:
+    """Refills at `per_minute` units a minute, holding at most a minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = None
+
+    def _refill(self, now: float):
+        if self.updated is not None:
+            self.level = min(
+                self.capacity, self.level + (now - self.updated) * self.rate
+            )
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken; requests over capacity wait for a full bucket."""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+    def give(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Request and token budgets of one model, shared by every call in the process.
+
+    Calls reserve one request and their estimated tokens (prompt plus max_tokens) before
+    going upstream, and give back what they did not use once the response reports its
+    usage. Waiting calls are served strictly by priority, then in arrival order, so
+    interactive calls overtake queued bulk work. When the provider answers 429 anyway,
+    pause() holds every call back for the time it asked for.
+    """
+
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.waiters = []
+        self.order = itertools.count()
+        self.paused_until = 0.0
+        self.timer = None
+
+    async def acquire(self, tokens: int, priority: Priority = Priority.interactive):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.order), tokens, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.settle(tokens, 0)
+            raise
+
+    def settle(self, reserved: int, used: int):
+        """Give back the part of a reservation that the call did not use."""
+        if used < reserved:
+            self.tokens.give(reserved - used)
+            self._dispatch()
+
+    def pause(self, seconds: float):
+        loop = asyncio.get_running_loop()
+        self.paused_until = max(self.paused_until, loop.time() + seconds)
+        self._dispatch()
+
+    def stats(self) -> dict:
+        # Levels are only refilled when a request is dispatched, so bring them up to date
+        now = asyncio.get_running_loop().time()
+        self.requests._refill(now)
+        self.tokens._refill(now)
+        return {
+            "waiting": sum(1 for *_, future in self.waiters if not future.done()),
+            "requests_available": int(self.requests.level),
+            "tokens_available": int(self.tokens.level),
+        }
+
+    def _wake(self):
+        self.timer = None
+        self._dispatch()
+
+    def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self.waiters:
+            _, _, tokens, future = self.waiters[0]
+            if future.done():
+                heapq.heappop(self.waiters)
+                continue
+
+            now = loop.time()
+            wait = max(
+                self.paused_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(tokens, now),
+            )
+            if wait > 0:
+                if self.timer is not None:
+                    self.timer.cancel()
+                self.timer = loop.call_later(wait, self._wake)
+                return
+
+            heapq.heappop(self.waiters)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            future.set_result(None)
+
+
+_limiters = {}
+
+
+def getLimiter(model: str) -> RateLimiter:
+    if model not in _limiters:
+        rpm, tpm = OPENAI_RATE_LIMITS.get(model, OPENAI_DEFAULT_RATE_LIMIT)
+        _limiters[model] = RateLimiter(rpm, tpm)
+    return _limiters[model]
+
+
+def limiterStats() -> dict:
+    return {model: limiter.stats() for model, limiter in _limiters.items()}
@@ -0,0 +1,33 @@
+from constants import CACHE_DIR, PAGE_CACHE_TTL, PAGE_CACHE_MAX_BYTES
+from tools.diskCache import DiskCache, CacheEntry
+
+# Converted pages keyed by normalized URL, shared by readWebpage and searchWeb crawls
+pageCache = DiskCache("pages", CACHE_DIR, PAGE_CACHE_MAX_BYTES, PAGE_CACHE_TTL)
+
+
+def conditional_headers(entry: CacheEntry) -> dict:
+    """Build If-None-Match / If-Modified-Since headers to revalidate a stale entry."""
+    headers = {}
+    if entry is None:
+        return headers
+    if entry.data.get("etag"):
+        headers["If-None-Match"] = entry.data["etag"]
+    if entry.data.get("last_modified"):
+        headers["If-Modified-Since"] = entry.data["last_modified"]
+    return headers
+
+
+def store_page(key: str, markdown: str, response, body: bytes):
+    if "no-store" in response.headers.get("Cache-Control", ""):
+        return
+
+    pageCache.put(
+        key,
+        {
+            "markdown": markdown,
+            "content_type": response.headers.get("Content-Type", ""),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        },
+        body,
+    )
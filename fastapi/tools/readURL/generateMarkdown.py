@@ -1,43 +1,170 @@
+import asyncio
+import time
+from typing import Tuple
 from tools.readURL.models import ContentURL, ReadURL
-from langchain_community.document_loaders import AsyncHtmlLoader
-from langchain_community.document_transformers import MarkdownifyTransformer
-from tools.openAI import process_search_results, clean_text
-from tools.readURL.utils import download_pdf_if_appropriate
+from tools.openAI import process_search_results, stream_summary
+from tools.readURL.utils import fetch_document, convert_document
+from tools.readURL.cache import pageCache, conditional_headers, store_page
+from tools.urlUtils import normalize_url
+from tools.models import ContentMode
+from tools.streaming import merge_streams
+from tools.threadingUtils import run_in_threadpool
 
 
-def generateMarkdownForPage(data: ReadURL) -> ContentURL:
-    try:
-        info = {}
-        scrape_from = []
-        content = []
-        summarized_content = []
+def pageKey(
+    url: str,
+    pages: str = None,
+    max_pages: int = None,
+    mode: ContentMode = ContentMode.full,
+) -> str:
+    key = normalize_url(url)
+    if pages or max_pages:
+        key += f"#pages={pages or ''}&max_pages={max_pages or ''}"
+    if mode == ContentMode.main:
+        key += "#mode=main"
+    return key
+
+
+async def readPage(
+    url: str,
+    pages: str = None,
+    max_pages: int = None,
+    mode: ContentMode = ContentMode.full,
+) -> str:
+    """
+    Returns the Markdown for a URL, served from the page cache when possible.
+
+    A fresh cache entry is returned as is. A stale entry is revalidated with a
+    conditional GET, so an unchanged page costs a 304 instead of a full fetch and
+    conversion. Otherwise the URL is downloaded once and its body is routed to the
+    PDF, HTML or plain text converter. When only some pages are requested, large PDFs
+    are read with HTTP Range requests instead of being downloaded in full. In main
+    mode, only the main content of HTML pages is kept.
+    """
+    key = pageKey(url, pages, max_pages, mode)
+    entry = await run_in_threadpool(pageCache.get, key)
+    if entry and entry.fresh:
+        pageCache.count("hits")
+        return entry.data["markdown"]
+
+    document = await fetch_document(
+        url, conditional_headers(entry), partial=bool(pages or max_pages)
+    )
+    if entry and document.response.status_code == 304:
+        print(f"Page not modified: {url}")
+        pageCache.count("revalidations")
+        await run_in_threadpool(pageCache.touch, key)
+        return entry.data["markdown"]
+
+    pageCache.count("refreshes" if entry else "misses")
+
+    text = await convert_document(document, pages, max_pages, mode)
+    if document.response.status_code == 200:
+        await run_in_threadpool(
+            store_page, key, text, document.response, document.body or b""
+        )
+    return text
+
 
-        for url in data.urls:
-            docs = download_pdf_if_appropriate(url)
-            if docs is not None:
-                info[url] = docs
-            else:
-                scrape_from.append(url)
+async def readPageAndMainContent(url: str) -> Tuple[str, str]:
+    """
+    Returns the Markdown of a URL in full and of its main content only, with one fetch.
 
-        loader = AsyncHtmlLoader(scrape_from)
-        docs = loader.load()
+    Both are served from the page cache when they are fresh there, and stored in it
+    under the keys readPage uses. When both are cached but stale, they are revalidated
+    together with a conditional GET, as in readPage. Pages other than HTML have the
+    same text for both.
+    """
+    keys = [pageKey(url), pageKey(url, mode=ContentMode.main)]
+    entries = [await run_in_threadpool(pageCache.get, key) for key in keys]
+    if all(entry and entry.fresh for entry in entries):
+        pageCache.count("hits")
+        return tuple(entry.data["markdown"] for entry in entries)
 
-        md = MarkdownifyTransformer()
-        converted_docs = md.transform_documents(docs)
+    # Both versions come from the same response, so either one's validators will do;
+    # a 304 is only useful when both are cached
+    cached = all(entries)
+    document = await fetch_document(
+        url, conditional_headers(entries[0]) if cached else None
+    )
+    if cached and document.response.status_code == 304:
+        print(f"Page not modified: {url}")
+        pageCache.count("revalidations")
+        for key in keys:
+            await run_in_threadpool(pageCache.touch, key)
+        return tuple(entry.data["markdown"] for entry in entries)
 
-        for i, docs in enumerate(converted_docs):
-            info[scrape_from[i]] = docs.page_content
+    pageCache.count("refreshes" if any(entries) else "misses")
+    texts = [await convert_document(document, mode=ContentMode.full)]
+    if document.kind == "html":
+        texts.append(await convert_document(document, mode=ContentMode.main))
+    else:
+        texts.append(texts[0])
+    if document.response.status_code == 200:
+        for key, text in zip(keys, texts):
+            await run_in_threadpool(
+                store_page, key, text, document.response, document.body or b""
+            )
+    return tuple(texts)
 
-        for url in data.urls:
-            content.append(info[url])
+
+async def generateMarkdownForPage(data: ReadURL) -> ContentURL:
+    try:
+        content = await asyncio.gather(
+            *[readPage(url, data.pages, data.max_pages, data.mode) for url in data.urls]
+        )
 
         if not data.summarize:
-            return ContentURL(urls=data.urls, content=clean_text(content, False))
+            return ContentURL(urls=data.urls, content=content)
 
-        for stuff in content:
-            information = process_search_results(None, stuff, data.entities)
-            summarized_content.append(information)
+        summarized_content = await asyncio.gather(
+            *[
+                process_search_results(
+                    None,
+                    stuff,
+                    data.entities,
+                    data.llm_cache,
+                    mode=data.summarize_mode,
+                )
+                for stuff in content
+            ]
+        )
 
         return ContentURL(urls=data.urls, content=summarized_content)
     except Exception as e:
         return ContentURL(urls=[], content=["Error reading Webpage: {e}"])
+
+
+async def streamMarkdownForPage(data: ReadURL):
+    """
+    Yields the events of every URL, then a final ("summary", ...) event.
+
+    URLs are read and summarized concurrently, so their events interleave and each one
+    carries its URL. While a summary is written, ("progress", ...) and ("token", ...)
+    events report it; every URL ends with a ("result", ...) event with its content, or
+    an ("error", ...) event.
+    """
+    start = time.monotonic()
+
+    async def events(url):
+        try:
+            content = await readPage(url, data.pages, data.max_pages, data.mode)
+            if not data.summarize:
+                yield "result", {"url": url, "content": content}
+                return
+            yield "progress", {"url": url, "stage": "read"}
+            async for event, payload in stream_summary(
+                None,
+                content,
+                data.entities,
+                data.llm_cache,
+                mode=data.summarize_mode,
+            ):
+                yield event, {"url": url, **payload}
+        except Exception as e:
+            print(f"Error reading {url}: {e}")
+            yield "error", {"url": url, "detail": f"Error reading Webpage: {e}"}
+
+    async for event in merge_streams([events(url) for url in data.urls]):
+        yield event
+    yield "summary", {"urls": data.urls, "elapsed": round(time.monotonic() - start, 3)}
@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+from tools.entityExtraction import check_entities
+from tools.models import ContentMode, SummarizeMode, StreamFormat
 
 
 class ContentURL(BaseModel):
@@ -22,6 +24,34 @@ class ReadURL(BaseModel):
     urls: List[str]
     summarize: bool = False
     entities: str = None
+    summarize_mode: SummarizeMode = Field(
+        SummarizeMode.abstractive,
+        description="'extractive' picks key sentences locally instead of calling the LLM.",
+    )
+    llm_cache: bool = Field(
+        True, description="Reuse cached LLM responses for identical prompts."
+    )
+    pages: Optional[str] = Field(
+        None,
+        description="1-based pages to extract from PDFs, e.g. '1-5,8,10-'.",
+        pattern=r"^\d+(-\d*)?(,\d+(-\d*)?)*$",
+    )
+    max_pages: Optional[int] = Field(
+        None, description="Maximum number of PDF pages to extract.", ge=1
+    )
+    mode: ContentMode = Field(
+        ContentMode.full,
+        description="'main' keeps only the main content of HTML pages, 'full' keeps everything.",
+    )
+    stream: Optional[StreamFormat] = Field(
+        None,
+        description="Stream summary tokens and progress as NDJSON lines or Server-Sent Events.",
+    )
+
+    @field_validator("entities")
+    @classmethod
+    def check_entities(cls, value):
+        return check_entities(value)
 
     class Config:
         json_schema_extra = {
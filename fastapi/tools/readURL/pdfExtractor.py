@@ -0,0 +1,67 @@
+import asyncio
+from io import BytesIO
+from typing import List
+from pypdf import PdfReader
+from constants import PDF_PARALLEL_MIN_PAGES, PROCESS_POOL_WORKERS
+from tools.processPool import getProcessPool
+from tools.threadingUtils import run_in_threadpool
+
+
+def parse_page_selection(pages: str, total: int, max_pages: int = None) -> List[int]:
+    """
+    Turns a 1-based page selection into a sorted list of 0-based page indices.
+
+    Example:
+        >>> parse_page_selection("1-3,7,10-", 12)
+        [0, 1, 2, 6, 9, 10, 11]
+    """
+    if not pages:
+        selected = list(range(total))
+    else:
+        indices = set()
+        for part in pages.split(","):
+            start, dash, end = part.strip().partition("-")
+            first = int(start)
+            last = (int(end) if end else total) if dash else first
+            indices.update(range(max(first, 1) - 1, min(last, total)))
+        selected = sorted(indices)
+
+    if max_pages:
+        selected = selected[:max_pages]
+    return selected
+
+
+def count_pages(body: bytes) -> int:
+    return len(PdfReader(BytesIO(body)).pages)
+
+
+def extract_pages(body: bytes, indices: List[int]) -> List[str]:
+    reader = PdfReader(BytesIO(body))
+    return [reader.pages[i].extract_text() or "" for i in indices]
+
+
+async def extract_pdf_text(body: bytes, pages: str = None, max_pages: int = None):
+    """
+    Extracts the text of the selected pages of an in-memory PDF.
+
+    Small selections are extracted on the threadpool. Large ones are split into one
+    contiguous batch per worker and extracted in parallel on the process pool, so a
+    300 page report no longer blocks a single worker for its whole duration.
+    """
+    total = await run_in_threadpool(count_pages, body)
+    indices = parse_page_selection(pages, total, max_pages)
+
+    if len(indices) < PDF_PARALLEL_MIN_PAGES:
+        texts = await run_in_threadpool(extract_pages, body, indices)
+        return "\n".join(texts)
+
+    loop = asyncio.get_running_loop()
+    size = -(-len(indices) // PROCESS_POOL_WORKERS)
+    batches = [indices[i : i + size] for i in range(0, len(indices), size)]
+    results = await asyncio.gather(
+        *[
+            loop.run_in_executor(getProcessPool(), extract_pages, body, batch)
+            for batch in batches
+        ]
+    )
+    return "\n".join(text for texts in results for text in texts)
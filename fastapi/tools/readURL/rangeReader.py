@@ -0,0 +1,189 @@
+import asyncio
+import io
+from pypdf import PageObject, PdfReader
+from pypdf.generic import NameObject
+from constants import PDF_RANGE_BLOCK_SIZE, PDF_RANGE_TAIL_BYTES
+from tools.httpClient import getClient
+from tools.readURL.pdfExtractor import parse_page_selection
+from tools.threadingUtils import run_in_threadpool
+
+INHERITABLE_PAGE_ATTRIBUTES = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+
+class RangeNotSupported(Exception):
+    pass
+
+
+class RangeFile(io.RawIOBase):
+    """
+    Read-only, seekable file backed by HTTP Range requests.
+
+    pypdf reads the trailer and cross-reference table from the end of the file and then
+    seeks to the objects it needs, so wrapping a remote PDF in this class only downloads
+    the byte ranges that are actually touched. Downloaded ranges are kept in fixed-size
+    blocks, and adjacent missing blocks are fetched with a single request.
+
+    The reader runs on a worker thread while the HTTP client belongs to the event loop,
+    so each fetch is scheduled back onto the loop and waited for.
+    """
+
+    def __init__(self, url: str, size: int, loop, etag: str = None):
+        self.url = url
+        self.size = size
+        self.loop = loop
+        self.etag = etag
+        self.position = 0
+        self.blocks = {}
+        self.requests = 0
+        self.downloaded = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        else:
+            position = self.size + offset
+        self.position = max(0, position)
+        return self.position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self.position
+        end = min(self.position + size, self.size)
+        if end <= self.position:
+            return b""
+
+        data = self._read_range(self.position, end)
+        self.position = end
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def _read_range(self, start: int, end: int) -> bytes:
+        first, last = start // PDF_RANGE_BLOCK_SIZE, (end - 1) // PDF_RANGE_BLOCK_SIZE
+        missing = [i for i in range(first, last + 1) if i not in self.blocks]
+        if missing:
+            asyncio.run_coroutine_threadsafe(
+                self.fetch_blocks(missing), self.loop
+            ).result()
+
+        data = b"".join(self.blocks[i] for i in range(first, last + 1))
+        offset = start - first * PDF_RANGE_BLOCK_SIZE
+        return data[offset : offset + end - start]
+
+    async def fetch_blocks(self, blocks):
+        # Group consecutive block numbers so each run costs one request
+        runs = []
+        for block in sorted(blocks):
+            if runs and runs[-1][-1] == block - 1:
+                runs[-1].append(block)
+            else:
+                runs.append([block])
+        await asyncio.gather(*[self._fetch_run(run[0], run[-1]) for run in runs])
+
+    async def _fetch_run(self, first: int, last: int):
+        start = first * PDF_RANGE_BLOCK_SIZE
+        end = min((last + 1) * PDF_RANGE_BLOCK_SIZE, self.size) - 1
+        headers = {"Range": f"bytes={start}-{end}"}
+        # If-Range only accepts strong validators; a weak ETag would make the
+        # server answer every request with the full body
+        if self.etag and not self.etag.startswith("W/"):
+            headers["If-Range"] = self.etag
+
+        # Streamed, so a reply that ignores the range is dropped before its body is read
+        async with getClient().stream("GET", self.url, headers=headers) as response:
+            if response.status_code != 206:
+                raise RangeNotSupported(
+                    f"Expected 206 for {self.url}, got {response.status_code}"
+                )
+            data = await response.aread()
+
+        self.requests += 1
+        self.downloaded += len(data)
+        for block in range(first, last + 1):
+            offset = (block - first) * PDF_RANGE_BLOCK_SIZE
+            self.blocks[block] = data[offset : offset + PDF_RANGE_BLOCK_SIZE]
+
+    async def prefetch_tail(self):
+        """Fetch the end of the file, where the trailer and xref table live."""
+        start = max(self.size - PDF_RANGE_TAIL_BYTES, 0)
+        await self.fetch_blocks(
+            range(
+                start // PDF_RANGE_BLOCK_SIZE,
+                (self.size - 1) // PDF_RANGE_BLOCK_SIZE + 1,
+            )
+        )
+
+
+def find_page(reader: PdfReader, index: int) -> PageObject:
+    """
+    Resolves one page by walking down the page tree, skipping every subtree whose
+    /Count shows the page is not in it.
+
+    `reader.pages` flattens the whole tree, which loads every page object of the file;
+    here only the nodes on the path to the page and their direct kids are loaded.
+    Inheritable attributes such as /MediaBox and /Resources are carried down the way
+    pypdf does when flattening.
+    """
+    node = reader.trailer["/Root"]["/Pages"].get_object()
+    inherited = {}
+    while True:
+        for attribute in INHERITABLE_PAGE_ATTRIBUTES:
+            if attribute in node:
+                inherited[attribute] = node[attribute]
+
+        for reference in node["/Kids"]:
+            kid = reference.get_object()
+            if "/Kids" in kid:
+                count = int(kid["/Count"])
+                if index < count:
+                    node = kid
+                    break
+                index -= count
+            elif index == 0:
+                page = PageObject(reader, reference)
+                page.update(kid)
+                for attribute, value in inherited.items():
+                    if attribute not in page:
+                        page[NameObject(attribute)] = value
+                return page
+            else:
+                index -= 1
+        else:
+            raise IndexError("Page index out of range")
+
+
+def extract_selected_pages(file, pages: str = None, max_pages: int = None) -> str:
+    reader = PdfReader(file)
+    total = int(reader.trailer["/Root"]["/Pages"]["/Count"])
+    indices = parse_page_selection(pages, total, max_pages)
+    return "\n".join(find_page(reader, i).extract_text() or "" for i in indices)
+
+
+async def extract_remote_pdf_text(
+    url: str, size: int, etag: str = None, pages: str = None, max_pages: int = None
+) -> str:
+    """
+    Extracts the selected pages of a remote PDF without downloading the whole file.
+
+    Raises RangeNotSupported when the server stops honouring Range requests, so the
+    caller can fall back to a full download.
+    """
+    file = RangeFile(url, size, asyncio.get_running_loop(), etag)
+    await file.prefetch_tail()
+    text = await run_in_threadpool(extract_selected_pages, file, pages, max_pages)
+    print(f"Read {file.downloaded} of {size} bytes in {file.requests} range requests")
+    return text
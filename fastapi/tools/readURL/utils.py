@@ -1,40 +1,157 @@
-import requests
-import uuid
-import os
-from constants import IMAGE_DIR
-from langchain_community.document_loaders import PyPDFLoader
+import re
+from dataclasses import dataclass
+from constants import PDF_RANGE_MIN_BYTES
+from tools.httpClient import getClient
+from tools.htmlToMarkdown import parse_html, element_to_markdown
+from tools.mainContent import main_content_or_full
+from tools.models import ContentMode
+from tools.readURL.pdfExtractor import extract_pdf_text
+from tools.readURL.rangeReader import extract_remote_pdf_text, RangeNotSupported
+from tools.threadingUtils import run_in_threadpool
 
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+TEXT_CONTENT_TYPES = ("application/json", "application/xml", "application/javascript")
+HTML_MARKERS = (b"<!doctype html", b"<html", b"<head", b"<body")
+SNIFF_BYTES = 1024
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+META_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?([\w.:-]+)", re.I)
 
-def download_pdf_if_appropriate(url):
-    """Download the PDF from a URL if the content type is appropriate."""
-    id = str(uuid.uuid4())
-    path = os.getcwd() + f"/{IMAGE_DIR}"
 
-    if not os.path.exists(path):
-        os.makedirs(path)
+@dataclass
+class FetchedDocument:
+    response: object
+    # None when the PDF is left on the server to be read with Range requests
+    body: bytes
+    # "pdf", "html" or "text"; None when the server answered 304
+    kind: str
 
-    destination = f"{path}/{id}.pdf"
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.response.encoding or "utf-8", errors="replace")
+
+    @property
+    def html(self):
+        """
+        The body for the HTML parser.
+
+        The charset of the Content-Type header wins. Without one, a page declaring its
+        charset in a <meta> tag is handed over as bytes, so lxml decodes it with that
+        charset; any other page is decoded as UTF-8.
+        """
+        if self.response.charset_encoding is None and META_CHARSET.search(
+            self.body[:SNIFF_BYTES]
+        ):
+            return self.body
+        return self.text
+
+
+def sniff_document_type(content_type: str, head: bytes) -> str:
+    """
+    Decide how to convert a response from its Content-Type header and first bytes.
+
+    A body starting with the PDF signature is a PDF unless the header says HTML, since
+    servers regularly label PDFs as application/octet-stream; HTML markers likewise win
+    over text/plain.
+
+    Example:
+        >>> sniff_document_type("application/octet-stream", b"%PDF-1.7")
+        'pdf'
+        >>> sniff_document_type("text/html", b"<p>Save as %PDF-1.4</p>")
+        'html'
+    """
+    mime = content_type.split(";")[0].strip().lower()
+    head = head[:SNIFF_BYTES]
+    if mime in HTML_CONTENT_TYPES:
+        return "html"
+    if head.startswith(b"%PDF-") or mime == "application/pdf":
+        return "pdf"
+
+    sample = head.lstrip().lower()
+    if sample.startswith(HTML_MARKERS):
+        return "html"
+    if mime.startswith("text/") or mime in TEXT_CONTENT_TYPES:
+        return "text"
+    if any(marker in sample for marker in HTML_MARKERS):
+        return "html"
+    return "text"
+
+
+def supports_ranges(response) -> bool:
     try:
-        with requests.get(url, stream=True) as response:
-            response.raise_for_status()  # Check for HTTP errors
-
-            # Check if the Content-Type header indicates a PDF
-            content_type = response.headers.get("Content-Type", "")
-            if "application/pdf" in content_type:
-                print("The content is a PDF. Starting download...")
-                with open(destination, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                print("Download successful.")
-                loader = PyPDFLoader(destination)
-                docs = loader.load_and_split()
-                response = ""
-                for doc in docs:
-                    response += doc.page_content
-                return response
-
-            else:
-                return None
-    except requests.RequestException as e:
-        print(f"Failed to download the file: {e}")
-        return None
+        size = int(response.headers.get("Content-Length", 0))
+    except ValueError:
+        return False
+    return (
+        response.status_code == 200
+        and response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        and "Content-Encoding" not in response.headers
+        and size >= PDF_RANGE_MIN_BYTES
+    )
+
+
+async def fetch_document(url, headers=None, partial=False) -> FetchedDocument:
+    """
+    Download a URL once and sniff the type of its body.
+
+    With partial set, a large PDF served with Accept-Ranges is not downloaded: the
+    stream is closed after the first bytes so only the requested pages are fetched later.
+    """
+    async with getClient().stream("GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            return FetchedDocument(response=response, body=b"", kind=None)
+
+        chunks = response.aiter_bytes()
+        head = b""
+        async for chunk in chunks:
+            head += chunk
+            if len(head) >= SNIFF_BYTES:
+                break
+
+        kind = sniff_document_type(response.headers.get("Content-Type", ""), head)
+        if partial and kind == "pdf" and supports_ranges(response):
+            return FetchedDocument(response=response, body=None, kind=kind)
+
+        body = head + b"".join([chunk async for chunk in chunks])
+        return FetchedDocument(response=response, body=body, kind=kind)
+
+
+def convert_html(html, mode: ContentMode = ContentMode.full) -> str:
+    """
+    Convert an HTML page (str or bytes) to Markdown, keeping only its main content in
+    main mode.
+    """
+    tree = parse_html(html)
+    if tree is None:
+        return ""
+    if mode == ContentMode.main:
+        tree = main_content_or_full(tree)
+    return element_to_markdown(tree)
+
+
+async def convert_document(
+    document: FetchedDocument,
+    pages: str = None,
+    max_pages: int = None,
+    mode: ContentMode = ContentMode.full,
+) -> str:
+    """Route a fetched body to the PDF, HTML or plain text converter."""
+    if document.kind == "pdf" and document.body is None:
+        print("The content is a large PDF. Reading the requested pages...")
+        try:
+            return await extract_remote_pdf_text(
+                str(document.response.url),
+                int(document.response.headers["Content-Length"]),
+                document.response.headers.get("ETag"),
+                pages,
+                max_pages,
+            )
+        except RangeNotSupported as e:
+            print(f"{e}, falling back to a full download")
+            document = await fetch_document(str(document.response.url))
+
+    if document.kind == "pdf":
+        print("The content is a PDF. Extracting text...")
+        return await extract_pdf_text(document.body, pages, max_pages)
+    if document.kind == "html":
+        return await run_in_threadpool(convert_html, document.html, mode)
+    return document.text
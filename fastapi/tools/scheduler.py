@@ -0,0 +1,154 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+from constants import (
+    CRAWL_GLOBAL_CONCURRENCY,
+    CRAWL_PER_HOST_LIMIT,
+    CRAWL_POLITENESS_DELAY,
+    CRAWL_REQUEST_WINDOW,
+)
+
+
+class HostState:
+    def __init__(self):
+        self.active = 0
+        self.next_slot = 0.0
+
+
+class Lane:
+    """The queue of fetches waiting on behalf of one crawl."""
+
+    def __init__(self, scheduler: "FetchScheduler", window: int):
+        self.scheduler = scheduler
+        self.window = window
+        self.waiters = deque()
+
+    def slot(self, url: str):
+        return self.scheduler.slot(self, url)
+
+
+class FetchScheduler:
+    """
+    Process-wide scheduler for crawl fetches.
+
+    Every crawl gets its own lane. Whenever one of the `limit` global slots frees up,
+    lanes with waiting fetches are served round-robin, so a huge crawl and a small one
+    take turns instead of the small one queueing behind everything the huge one asked
+    for. Within a lane the oldest fetch whose host is below `per_host_limit` wins, so a
+    busy host does not block fetches to other hosts. Requests to the same host are also
+    spaced out by `politeness_delay` across all crawls.
+
+    Lanes have a `window` of fetches they may keep queued or in flight, which crawls use
+    as backpressure when deciding how many fetches to start.
+    """
+
+    def __init__(
+        self,
+        limit: int = CRAWL_GLOBAL_CONCURRENCY,
+        per_host_limit: int = CRAWL_PER_HOST_LIMIT,
+        politeness_delay: float = CRAWL_POLITENESS_DELAY,
+    ):
+        self.limit = limit
+        self.per_host_limit = per_host_limit
+        self.politeness_delay = politeness_delay
+        self.active = 0
+        self.hosts = {}
+        # Hosts gone idle, in order, until their politeness delay has passed
+        self.idle = deque()
+        self.lanes = deque()
+
+    def lane(self, window: int = CRAWL_REQUEST_WINDOW) -> Lane:
+        return Lane(self, window)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": sum(len(lane.waiters) for lane in self.lanes),
+            "lanes": len(self.lanes),
+        }
+
+    @asynccontextmanager
+    async def slot(self, lane: Lane, url: str):
+        host = urlsplit(url).hostname or ""
+        state = await self._acquire(lane, host)
+        try:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            wait = state.next_slot - now
+            state.next_slot = max(now, state.next_slot) + self.politeness_delay
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield
+        finally:
+            self._release(host)
+
+    async def _acquire(self, lane: Lane, host: str) -> HostState:
+        future = asyncio.get_running_loop().create_future()
+        lane.waiters.append((host, future))
+        if lane not in self.lanes:
+            self.lanes.append(lane)
+        self._dispatch()
+
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation arrived
+                self._release(host)
+            else:
+                lane.waiters.remove((host, future))
+            raise
+
+    def _release(self, host: str):
+        self.active -= 1
+        state = self.hosts[host]
+        state.active -= 1
+        if state.active == 0:
+            self.idle.append((host, state))
+        self._prune()
+        self._dispatch()
+
+    def _prune(self):
+        """Forget the hosts that are idle and past their politeness delay."""
+        now = asyncio.get_running_loop().time()
+        while self.idle:
+            host, state = self.idle[0]
+            if state.active == 0 and state.next_slot > now:
+                break
+            self.idle.popleft()
+            if state.active == 0 and self.hosts.get(host) is state:
+                del self.hosts[host]
+
+    def _dispatch(self):
+        while self.active < self.limit and self.lanes:
+            for _ in range(len(self.lanes)):
+                lane = self.lanes[0]
+                self.lanes.rotate(-1)
+                if self._grant(lane):
+                    break
+            else:
+                # Every waiting fetch is held back by its host limit
+                break
+
+        for lane in [lane for lane in self.lanes if not lane.waiters]:
+            self.lanes.remove(lane)
+
+    def _grant(self, lane: Lane) -> bool:
+        for waiter in lane.waiters:
+            host, future = waiter
+            if future.done():
+                continue
+            state = self.hosts.setdefault(host, HostState())
+            if state.active >= self.per_host_limit:
+                continue
+
+            lane.waiters.remove(waiter)
+            state.active += 1
+            self.active += 1
+            future.set_result(state)
+            return True
+        return False
+
+
+scheduler = FetchScheduler()
@@ -0,0 +1,36 @@
+import json
+from constants import SERP_CACHE_TTL, SERP_CACHE_STALE_TTL, SERP_CACHE_MAX_ENTRIES
+from tools.memoryCache import MemoryCache
+from tools.searchWeb.models import SearchParams
+
+# Search engine responses keyed by the normalized search parameters
+serpCache = MemoryCache(SERP_CACHE_TTL, SERP_CACHE_STALE_TTL, SERP_CACHE_MAX_ENTRIES)
+
+
+def serp_key(params: SearchParams) -> str:
+    """
+    Cache key of the search engine request for the parameters.
+
+    The query is compared without case and extra whitespace, and engines in any order.
+    Parameters that only change what is done with the results (limit, crawl, ...) are
+    not part of the key.
+
+    Example:
+        >>> serp_key(SearchParams(query="  Quantum  Computing")) == serp_key(
+        ...     SearchParams(query="quantum computing", engines=["duckduckgo", "google"])
+        ... )
+        True
+    """
+    return json.dumps(
+        [
+            " ".join(params.query.casefold().split()),
+            sorted(set(engine.value for engine in params.engines)),
+            params.categories,
+            params.language,
+            params.time_range,
+            params.pageno,
+            params.safesearch.value,
+            params.external_bang,
+            params.format,
+        ]
+    )
@@ -1,6 +1,9 @@
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict
 from enum import Enum
+from constants import SEARCH_BATCH_MAX_QUERIES
+from tools.entityExtraction import check_entities
+from tools.models import ContentMode, SummarizeMode, StreamFormat
 
 
 class SearchEngines(str, Enum):
@@ -56,12 +59,40 @@ class SearchParams(BaseModel):
         pattern="^(general|images|news|videos|map|science|music|files|it|social media|economy)$",
     )
     crawl: Optional[bool] = Field(False, description="Crawl the webpage for content")
+    mode: ContentMode = Field(
+        ContentMode.full,
+        description="'main' keeps only the main content of crawled pages, 'full' keeps everything.",
+    )
     summarize: Optional[bool] = Field(
         False, description="Summarize the webpage content"
     )
     entities: Optional[str] = Field(
         None, description="Stringified JSON of response format"
     )
+    summarize_mode: Optional[SummarizeMode] = Field(
+        SummarizeMode.abstractive,
+        description="'extractive' picks key sentences locally instead of calling the LLM.",
+    )
+    llm_cache: Optional[bool] = Field(
+        True, description="Reuse cached LLM responses for identical prompts."
+    )
+    serp_cache: Optional[bool] = Field(
+        True,
+        description="Reuse recent search engine responses for the same query and options.",
+    )
+    collapse_duplicates: Optional[bool] = Field(
+        True,
+        description="Return crawled results whose content nearly duplicates another one (mirrors, syndicated copies) once, listing the duplicate URLs on it.",
+    )
+    result_timeout: Optional[float] = Field(
+        None,
+        description="Seconds to spend reading and summarizing each result before returning it as timed out.",
+        gt=0,
+    )
+    stream: Optional[StreamFormat] = Field(
+        None,
+        description="Stream results, summary tokens and progress as NDJSON lines or Server-Sent Events.",
+    )
     language: Optional[str] = Field(
         None, description="The language for the search results. E.g., 'en', 'fr', etc."
     )
@@ -105,7 +136,7 @@ class SearchParams(BaseModel):
     def validate_entities(cls, value, values):
         if value and not values.data.get("summarize", False):
             raise ValueError("entities can only be true if summarize is true")
-        return value
+        return check_entities(value)
 
     class Config:
         json_schema_extra = {
@@ -221,6 +252,16 @@ class SearchQuery:
         )
 
 
+class ResultStatus(str, Enum):
+    fetched = "fetched"  # Content read, not summarized
+    summarized = "summarized"  # Content read and summarized
+    timed_out = (
+        "timed_out"  # Out of time; content holds the page if it was read by then
+    )
+    failed = "failed"  # The page could not be read or summarized
+    duplicate = "duplicate"  # Nearly the same content as another result; not summarized
+
+
 class SearchResult(BaseModel):
     url: str
     title: str
@@ -228,9 +269,29 @@ class SearchResult(BaseModel):
     score: Optional[float] = None
     category: Optional[str] = None
     content: Optional[str] = None
+    status: Optional[ResultStatus] = None
+    duplicates: Optional[List[str]] = None
 
 
 class SearchResponse(BaseModel):
     query: str
     answers: Optional[List[str]] = None
     results: Optional[List[SearchResult]] = None
+    error: Optional[str] = None
+
+
+class SearchBatchParams(BaseModel):
+    searches: List[SearchParams] = Field(
+        ...,
+        description="The searches to run. Pages returned by several of them are read and summarized once.",
+        min_length=1,
+        max_length=SEARCH_BATCH_MAX_QUERIES,
+    )
+
+
+class SearchBatchResponse(BaseModel):
+    responses: List[SearchResponse]
+    crawled: int = Field(
+        0,
+        description="Number of pages read for all the searches, counting a page once per set of content options.",
+    )
@@ -0,0 +1,96 @@
+import re
+from hashlib import blake2b
+from typing import Optional
+import numpy as np
+from constants import (
+    NEAR_DUPLICATE_SIMILARITY,
+    NEAR_DUPLICATE_MIN_WORDS,
+    NEAR_DUPLICATE_SHINGLE_WORDS,
+)
+from tools.extractiveSummary import strip_markdown
+
+WORD = re.compile(r"\w+")
+PERMUTATIONS = 128
+PRIME = (1 << 31) - 1
+# Fixed seed, so signatures are the same in every process
+_random = np.random.default_rng(0)
+A = _random.integers(1, PRIME, PERMUTATIONS, dtype=np.uint64)
+B = _random.integers(0, PRIME, PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(words: list, size: int = NEAR_DUPLICATE_SHINGLE_WORDS) -> set:
+    """
+    Overlapping runs of `size` words.
+
+    Example:
+        >>> sorted(shingles(["a", "b", "c", "d"], 3))
+        ['a b c', 'b c d']
+    """
+    return {" ".join(words[i : i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+def minhash(words: list) -> np.ndarray:
+    """
+    MinHash signature of the shingles of the words.
+
+    The share of positions where two signatures are equal estimates the Jaccard
+    similarity of the shingle sets. Shingles are hashed with BLAKE2, not the salted
+    built-in hash, so the same pages collapse the same way in every process.
+    """
+    hashes = np.array(
+        [
+            int.from_bytes(blake2b(shingle.encode(), digest_size=8).digest(), "big")
+            % PRIME
+            for shingle in shingles(words)
+        ],
+        dtype=np.uint64,
+    )
+    # One universal hash (a * h + b) mod p per permutation; below 2**63, so no overflow
+    return ((np.outer(hashes, A) + B) % np.uint64(PRIME)).min(axis=0)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float(np.mean(a == b))
+
+
+class NearDuplicateIndex:
+    """
+    Finds search results whose content nearly duplicates a result read before them.
+
+    The main content of each page is reduced to its prose and its word shingles are
+    signed with MinHash; a result sharing at least `threshold` of its shingles with an
+    earlier one is a near duplicate of it, as happens with syndicated articles and
+    mirrors. Fingerprinting the main content keeps different articles of one site from
+    matching on their shared template. Pages shorter than `min_words` words are never
+    matched, since short or empty pages look alike without being copies.
+    """
+
+    def __init__(
+        self,
+        threshold: float = NEAR_DUPLICATE_SIMILARITY,
+        min_words: int = NEAR_DUPLICATE_MIN_WORDS,
+    ):
+        self.threshold = threshold
+        self.min_words = min_words
+        self.signatures = {}
+        self.duplicate_of = {}
+
+    def add(self, url: str, content: str) -> Optional[str]:
+        """
+        Records the content of a result, returning the URL of the earlier result it
+        nearly duplicates, if any.
+        """
+        words = WORD.findall(strip_markdown(content).lower())
+        if len(words) < self.min_words:
+            return None
+        return self.add_signature(url, minhash(words))
+
+    def add_signature(self, url: str, signature: np.ndarray) -> Optional[str]:
+        """Like add, for a result whose content was signed by another index."""
+        for other, other_signature in self.signatures.items():
+            if similarity(signature, other_signature) >= self.threshold:
+                self.duplicate_of[url] = other
+                return other
+        self.signatures[url] = signature
+        return None
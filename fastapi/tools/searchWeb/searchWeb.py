@@ -1,17 +1,33 @@
-import requests
-from requests.auth import HTTPBasicAuth
-from tools.readURL.models import ReadURL
-from tools.openAI import process_search_results, clean_text
-from tools.readURL.generateMarkdown import generateMarkdownForPage
-from tools.searchWeb.models import SearchParams, SearchResponse, SearchResult
+import asyncio
+import httpx
+import time
+from typing import Callable, List, Tuple
+from constants import SEARCH_CONCURRENCY, SEARCH_RESULT_TIMEOUT
+from tools.openAI import process_search_results, stream_summary
+from tools.models import ContentMode
+from tools.textCleaner import clean_text
+from tools.readURL.generateMarkdown import readPage, readPageAndMainContent
+from tools.searchWeb.models import (
+    SearchParams,
+    SearchResponse,
+    SearchResult,
+    SearchBatchParams,
+    SearchBatchResponse,
+    ResultStatus,
+)
+from tools.searchWeb.cache import serpCache, serp_key
+from tools.searchWeb.nearDuplicates import NearDuplicateIndex
+from tools.httpClient import getClient
+from tools.urlUtils import canonicalize_url
 import os
 
 
-def search(params: SearchParams):
+async def querySearchEngine(params: SearchParams) -> dict:
     base_url = os.getenv("SEARCH_ENGINE_URL")
-    auth = HTTPBasicAuth(
-        os.getenv("SEARCH_ENGINE_USERNAME"), os.getenv("SEARCH_ENGINE_PASSWORD")
-    )
+    username = os.getenv("SEARCH_ENGINE_USERNAME")
+    password = os.getenv("SEARCH_ENGINE_PASSWORD")
+    # Only send credentials when the search engine is configured with them
+    auth = httpx.BasicAuth(username, password) if username and password else None
     query = params.to_search_query()
 
     search_params = {
@@ -29,71 +45,373 @@ def search(params: SearchParams):
         "redirect_to_first_result": params.redirect_to_first_result,
     }
 
-    response = requests.get(base_url, params=search_params, auth=auth)
+    # Drop unset parameters so they are not sent as empty strings
+    search_params = {k: v for k, v in search_params.items() if v is not None}
+
+    response = await getClient().get(base_url, params=search_params, auth=auth)
+
+    if response.status_code != 200:
+        raise Exception(f"Error: {response.status_code}, {response.text}")
+
+    return response.json()
+
+
+async def fetchResults(params: SearchParams):
+    """
+    Queries the search engine, returning its response and the results to use.
+
+    Responses come from the SERP cache unless serp_cache is false.
+    """
+    if params.serp_cache:
+        data = await serpCache.get(serp_key(params), lambda: querySearchEngine(params))
+    else:
+        serpCache.count("bypasses")
+        data = await querySearchEngine(params)
+
+    # Filter results by requested engines
+    requested_engines = set(engine.name for engine in params.engines)
+    filtered_results = [
+        result
+        for result in data.get("results", [])
+        if set(result.get("engines", [])) & requested_engines
+    ]
+
+    # Sort results by score in descending order
+    sorted_results = sorted(
+        filtered_results, key=lambda x: x.get("score", 0), reverse=True
+    )
+
+    # Limit results to specified limit
+    return data, sorted_results[: params.limit]
+
+
+def toSearchResult(
+    res: dict, content: str, status: ResultStatus = None
+) -> SearchResult:
+    return SearchResult(
+        url=res["url"],
+        title=res["title"],
+        description=res["content"],
+        score=res.get("score"),
+        category=res.get("category"),
+        content=content,
+        status=status,
+    )
+
+
+async def readResult(
+    res: dict, params: SearchParams, main_content: bool = False
+) -> Tuple[str, str]:
+    """
+    Returns the Markdown of a result, and with main_content the Markdown of its main
+    content as well (None otherwise), both from one fetch.
+    """
+    print(f"Parsing {res['url']}")
+    try:
+        # The Markdown as is; summaries need its paragraph breaks
+        if not main_content:
+            return await readPage(res["url"], mode=params.mode), None
+        if params.mode == ContentMode.main:
+            page = await readPage(res["url"], mode=params.mode)
+            return page, page
+        return await readPageAndMainContent(res["url"])
+    except Exception as e:
+        return f"Error reading Webpage: {e}", None
+
+
+async def crawlResult(
+    res: dict,
+    params: SearchParams,
+    semaphore: asyncio.Semaphore,
+    emit: Callable[[str, dict], None] = None,
+    duplicates: NearDuplicateIndex = None,
+) -> SearchResult:
+    """
+    Reads and summarizes one search result within the result timeout.
+
+    A result that runs out of time is returned as timed out, with the page content if
+    it was read by then. Errors only fail their own result. With emit, the summary is
+    streamed and its ("progress", ...) and ("token", ...) events are passed to emit,
+    keyed by the URL of the result. With duplicates, a page whose main content nearly
+    duplicates that of a page read before it is returned as a duplicate without
+    content, and is not summarized.
+    """
+    page = None
+
+    async def summarize(parsed_content: str) -> str:
+        if emit is None:
+            return await process_search_results(
+                params.query,
+                parsed_content,
+                params.entities,
+                params.llm_cache,
+                mode=params.summarize_mode,
+            )
+        async for event, payload in stream_summary(
+            params.query,
+            parsed_content,
+            params.entities,
+            params.llm_cache,
+            mode=params.summarize_mode,
+        ):
+            if event == "result":
+                return payload["content"]
+            if event == "error":
+                raise Exception(payload["detail"])
+            emit(event, {"url": res["url"], **payload})
+
+    async def pipeline() -> SearchResult:
+        nonlocal page
+        parsed_content, main_content = await readResult(
+            res, params, duplicates is not None
+        )
+        if parsed_content.startswith("Error reading Webpage: "):
+            return toSearchResult(res, parsed_content, ResultStatus.failed)
+        page = parsed_content
+        if duplicates is not None and duplicates.add(res["url"], main_content):
+            return toSearchResult(res, None, ResultStatus.duplicate)
+        if not params.summarize:
+            return toSearchResult(
+                res, clean_text(parsed_content, False), ResultStatus.fetched
+            )
+
+        print(f"Summarizing {res['url']}")
+        summarized_content = await summarize(parsed_content)
+        return toSearchResult(res, summarized_content, ResultStatus.summarized)
+
+    async with semaphore:
+        try:
+            return await asyncio.wait_for(
+                pipeline(), params.result_timeout or SEARCH_RESULT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            print(f"Timed out on {res['url']}")
+            content = clean_text(page, False) if page is not None else None
+            return toSearchResult(res, content, ResultStatus.timed_out)
+        except Exception as e:
+            print(f"Error on {res['url']}: {e}")
+            return toSearchResult(res, f"Error: {e}", ResultStatus.failed)
+
+
+def collapseDuplicates(
+    results: List[SearchResult], duplicates: NearDuplicateIndex
+) -> List[SearchResult]:
+    """
+    Drops near duplicates from ranked results, listing their URLs on the result kept.
 
-    if response.status_code == 200:
-        data = response.json()
+    The best ranked result of a group of duplicates is kept. Only the page read first
+    was summarized, so the kept result takes its content and status when it is not
+    that page.
+    """
+    groups = {}
+    for result in results:
+        first = duplicates.duplicate_of.get(result.url, result.url)
+        groups.setdefault(first, []).append(result)
 
-        # Filter results by requested engines
-        requested_engines = set(engine.name for engine in params.engines)
-        filtered_results = [
-            result
-            for result in data.get("results", [])
-            if set(result.get("engines", [])) & requested_engines
+    collapsed = []
+    for first, group in groups.items():
+        kept = group[0]
+        if len(group) > 1:
+            read = next(result for result in group if result.url == first)
+            kept.content = read.content
+            kept.status = read.status
+            kept.duplicates = [result.url for result in group[1:]]
+        collapsed.append(kept)
+    return collapsed
+
+
+async def search(params: SearchParams):
+    data, limited_results = await fetchResults(params)
+
+    # Convert results to SearchResult models
+    if params.crawl:
+        # Read and summarize the results concurrently, keeping the ranking order
+        semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+        duplicates = NearDuplicateIndex() if params.collapse_duplicates else None
+        search_results = await asyncio.gather(
+            *[
+                crawlResult(res, params, semaphore, duplicates=duplicates)
+                for res in limited_results
+            ]
+        )
+        if duplicates is not None:
+            search_results = collapseDuplicates(search_results, duplicates)
+    else:
+        search_results = [
+            toSearchResult(
+                res, "Set crawl to true to fetch the content of the search results."
+            )
+            for res in limited_results
         ]
 
-        # Sort results by score in descending order
-        sorted_results = sorted(
-            filtered_results, key=lambda x: x.get("score", 0), reverse=True
+    return SearchResponse(
+        query=data["query"], answers=data.get("answers", []), results=search_results
+    )
+
+
+def crawlKey(res: dict, params: SearchParams) -> tuple:
+    """Results with the same key are read and summarized once for a batch."""
+    return (
+        canonicalize_url(res["url"]),
+        params.mode,
+        params.summarize,
+        params.entities,
+        params.summarize_mode,
+    )
+
+
+async def searchBatch(batch: SearchBatchParams) -> SearchBatchResponse:
+    """
+    Runs several searches at once, reading and summarizing each page only once.
+
+    The search engine is queried for all the searches concurrently. Results of crawled
+    searches are grouped by canonical URL and content options, so a page returned by
+    several searches is read once and summarized once for all of their queries, and
+    its content is given to each of them. A failed search is returned with its error
+    without failing the others.
+
+    Since pages are shared between searches, near duplicates are collapsed per search
+    after reading, keeping the best ranked copy; unlike a single search, every copy is
+    read and summarized.
+    """
+    searches = batch.searches
+    fetched = await asyncio.gather(
+        *[fetchResults(params) for params in searches], return_exceptions=True
+    )
+
+    # Searches returning each page, keyed by canonical URL and content options
+    groups = {}
+    for params, outcome in zip(searches, fetched):
+        if params.crawl and not isinstance(outcome, Exception):
+            for res in outcome[1]:
+                groups.setdefault(crawlKey(res, params), []).append((res, params))
+
+    semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+    # MinHash signature of the main content of each page, for the searches that
+    # collapse duplicates (missing for pages too short or not read)
+    signatures = {}
+
+    async def crawl(key: tuple, group: list) -> SearchResult:
+        res, params = group[0]
+        queries = list(dict.fromkeys(params.query for _, params in group))
+        timeouts = [
+            params.result_timeout or SEARCH_RESULT_TIMEOUT for _, params in group
+        ]
+        shared = params.model_copy(
+            update={
+                "query": "; ".join(queries),
+                "result_timeout": max(timeouts),
+                "llm_cache": all(params.llm_cache for _, params in group),
+            }
         )
+        # An index of its own only signs the page, it never has an earlier one to match
+        fingerprint = None
+        if any(params.collapse_duplicates for _, params in group):
+            fingerprint = NearDuplicateIndex()
+        result = await crawlResult(res, shared, semaphore, duplicates=fingerprint)
+        if fingerprint is not None and res["url"] in fingerprint.signatures:
+            signatures[key] = fingerprint.signatures[res["url"]]
+        return result
 
-        # Limit results to specified limit
-        limited_results = sorted_results[: params.limit]
+    crawled = dict(
+        zip(
+            groups,
+            await asyncio.gather(*[crawl(key, group) for key, group in groups.items()]),
+        )
+    )
 
-        # Convert results to SearchResult models
+    responses = []
+    for params, outcome in zip(searches, fetched):
+        if isinstance(outcome, Exception):
+            print(f"Error searching {params.query}: {outcome}")
+            responses.append(SearchResponse(query=params.query, error=str(outcome)))
+            continue
+        data, limited_results = outcome
         if params.crawl:
-            search_results = []
+            results = []
             for res in limited_results:
-                print(f"Parsing {res['url']}")
-                parsed_content = generateMarkdownForPage(
-                    ReadURL(urls=[res["url"]], summarize=False)
-                ).content[0]
-                if params.summarize and not parsed_content.startswith(
-                    "Error reading Webpage: "
-                ):
-                    print(f"Summarizing {res['url']}")
-                    summarized_content = process_search_results(
-                        params.query, parsed_content, params.entities
-                    )
-                    parsed_content = summarized_content
-                else:
-                    parsed_content = clean_text(parsed_content, False)
-
-                search_results.append(
-                    SearchResult(
-                        url=res["url"],
-                        title=res["title"],
-                        description=res["content"],
-                        score=res.get("score"),
-                        category=res.get("category"),
-                        content=parsed_content,
-                    )
-                )
+                result = crawled[crawlKey(res, params)]
+                results.append(toSearchResult(res, result.content, result.status))
+            if params.collapse_duplicates:
+                duplicates = NearDuplicateIndex()
+                for res in limited_results:
+                    key = crawlKey(res, params)
+                    if key in signatures:
+                        duplicates.add_signature(res["url"], signatures[key])
+                results = collapseDuplicates(results, duplicates)
         else:
-            search_results = [
-                SearchResult(
-                    url=res["url"],
-                    title=res["title"],
-                    description=res["content"],
-                    score=res.get("score"),
-                    category=res.get("category"),
-                    content="Set crawl to true to fetch the content of the search results.",
+            results = [
+                toSearchResult(
+                    res, "Set crawl to true to fetch the content of the search results."
                 )
                 for res in limited_results
             ]
-
-        return SearchResponse(
-            query=data["query"], answers=data.get("answers", []), results=search_results
+        responses.append(
+            SearchResponse(
+                query=data["query"], answers=data.get("answers", []), results=results
+            )
         )
-    else:
-        raise Exception(f"Error: {response.status_code}, {response.text}")
+
+    return SearchBatchResponse(responses=responses, crawled=len(crawled))
+
+
+async def streamSearch(params: SearchParams):
+    """
+    Yields the ranked results first, then the content of each result as it is ready.
+
+    A ("serp", ...) event carries the query, answers and results with their
+    descriptions as soon as the search engine responds. With crawl, results are then
+    read and summarized concurrently, and each one ends with a ("result", ...) event
+    with its URL, content and status, in completion order; a near duplicate of a page
+    read before it has the duplicate status and the URL of that page in duplicate_of. While a summary is written,
+    ("progress", ...) and ("token", ...) events carry its URL. A final ("summary", ...)
+    event closes the stream. Closing the connection early cancels the work still
+    running, so clients can stop once they have the results they need.
+    """
+    start = time.monotonic()
+    summary = {"query": params.query, "urls": []}
+    try:
+        data, limited_results = await fetchResults(params)
+        summary["query"] = data["query"]
+        summary["urls"] = [res["url"] for res in limited_results]
+        content = None
+        if not params.crawl:
+            content = "Set crawl to true to fetch the content of the search results."
+        yield "serp", {
+            "query": data["query"],
+            "answers": data.get("answers", []),
+            "results": [
+                toSearchResult(res, content).model_dump() for res in limited_results
+            ],
+        }
+
+        if params.crawl and limited_results:
+            events = asyncio.Queue()
+            semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+            duplicates = NearDuplicateIndex() if params.collapse_duplicates else None
+
+            def emit(event: str, payload: dict):
+                events.put_nowait((event, payload))
+
+            async def crawl(res: dict):
+                result = await crawlResult(res, params, semaphore, emit, duplicates)
+                payload = result.model_dump(include={"url", "content", "status"})
+                if result.status == ResultStatus.duplicate:
+                    payload["duplicate_of"] = duplicates.duplicate_of[result.url]
+                emit("result", payload)
+
+            tasks = [asyncio.ensure_future(crawl(res)) for res in limited_results]
+            try:
+                for _ in range(len(tasks)):
+                    while (event := await events.get())[0] != "result":
+                        yield event
+                    yield event
+            finally:
+                for task in tasks:
+                    task.cancel()
+    except Exception as e:
+        print(f"Error searching {params.query}: {e}")
+        summary["error"] = str(e)
+
+    summary["elapsed"] = round(time.monotonic() - start, 3)
+    yield "summary", summary
@@ -0,0 +1,77 @@
+import asyncio
+import json
+from typing import AsyncIterator, List, Tuple
+from fastapi.responses import StreamingResponse
+from tools.models import StreamFormat
+
+MEDIA_TYPES = {
+    StreamFormat.ndjson: "application/x-ndjson",
+    StreamFormat.sse: "text/event-stream",
+}
+
+
+def encode_event(format: StreamFormat, event: str, data: dict) -> str:
+    """
+    Encode one event for the wire.
+
+    Example:
+        >>> encode_event(StreamFormat.ndjson, "page", {"url": "https://example.com"})
+        '{"event": "page", "url": "https://example.com"}\\n'
+        >>> encode_event(StreamFormat.sse, "page", {"url": "https://example.com"})
+        'event: page\\ndata: {"url": "https://example.com"}\\n\\n'
+    """
+    if format == StreamFormat.sse:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, **data}) + "\n"
+
+
+def streamingResponse(
+    events: AsyncIterator[Tuple[str, dict]], format: StreamFormat
+) -> StreamingResponse:
+    """Stream (event, data) pairs as NDJSON lines or Server-Sent Events."""
+
+    async def body():
+        async for event, data in events:
+            yield encode_event(format, event, data)
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        # Ask reverse proxies not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def merge_streams(streams: List[AsyncIterator]) -> AsyncIterator:
+    """
+    Run several async iterators concurrently and yield their items as they arrive.
+
+    An exception in any of them is raised to the consumer, and stopping early cancels
+    the ones still running.
+    """
+    queue = asyncio.Queue()
+    done = object()
+
+    async def pump(stream):
+        try:
+            async for item in stream:
+                await queue.put((item, None))
+        except Exception as e:
+            await queue.put((None, e))
+        finally:
+            await queue.put((done, None))
+
+    tasks = [asyncio.ensure_future(pump(stream)) for stream in streams]
+    running = len(tasks)
+    try:
+        while running:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                running -= 1
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,88 @@
+import asyncio
+import re
+from html import unescape
+from typing import List
+from constants import PROCESS_POOL_WORKERS, TEXT_CLEAN_PARALLEL_MIN_BYTES
+from tools.processPool import getProcessPool
+from tools.threadingUtils import run_in_threadpool
+
+TAG = r"<[^>]+>"
+# Same character references as html.unescape, so each match unescapes on its own
+ENTITY = r"&(?:#[0-9]+;?|#[xX][0-9a-fA-F]+;?|[^\t\n\f <&#;]{1,32};?)"
+IMAGE_URL = r"https?://[\w\.-]+/\S+\.(?:jpg|jpeg|png|gif|bmp)(?:\?\S*)?"
+
+# One scan finds tags, entities and image URLs. It matches the old passes (tags, then
+# entities, then image URLs) except where one match swallows the start of another:
+# an entity running into a URL ("&https://x.org/a.png" keeps the URL), an entity that
+# decodes to a URL ("https&#58;//x.org/a.png" is kept) and an entity split by a tag
+# ("&am<b>p;" stays "&amp;")
+MARKUP = re.compile(f"{TAG}|{ENTITY}")
+MARKUP_AND_IMAGES = re.compile(f"{TAG}|{ENTITY}|{IMAGE_URL}")
+
+
+def _replace(match: re.Match) -> str:
+    text = match.group()
+    return unescape(text) if text[0] == "&" else ""
+
+
+def clean_text(text: str, remove_images: bool = True) -> str:
+    """
+    Strips HTML tags, unescapes HTML entities, removes image URLs (optionally) and
+    collapses whitespace.
+
+    Tags, entities and image URLs are handled in a single scan with a precompiled
+    pattern, which is skipped entirely for text without any of them, and whitespace
+    is collapsed by str.split. Anything that is not a string is returned unchanged.
+
+    Example:
+        >>> clean_text("<p>Fish &amp; chips</p>  https://x.org/a.png  here")
+        'Fish & chips here'
+        >>> clean_text("https://x.org/a.png &lt;b&gt;", remove_images=False)
+        'https://x.org/a.png <b>'
+    """
+    if not isinstance(text, str):
+        return text
+    if "<" in text or "&" in text or (remove_images and "://" in text):
+        pattern = MARKUP_AND_IMAGES if remove_images else MARKUP
+        text = pattern.sub(_replace, text)
+    return " ".join(text.split())
+
+
+def clean_texts(texts: List[str], remove_images: bool = True) -> List[str]:
+    """Cleans a batch of documents, see clean_text."""
+    return [clean_text(text, remove_images) for text in texts]
+
+
+async def clean_texts_parallel(
+    texts: List[str], remove_images: bool = True
+) -> List[str]:
+    """
+    Cleans a batch of documents off the event loop.
+
+    Batches smaller than TEXT_CLEAN_PARALLEL_MIN_BYTES are cleaned on the threadpool.
+    Larger ones are split into one batch of about the same size per worker and
+    cleaned in parallel on the process pool.
+    """
+    size = sum(len(text) for text in texts if isinstance(text, str))
+    if len(texts) < 2 or size < TEXT_CLEAN_PARALLEL_MIN_BYTES:
+        return await run_in_threadpool(clean_texts, texts, remove_images)
+
+    # Fill the batches in order, so the results come back in the order of the texts
+    target = size / min(PROCESS_POOL_WORKERS, len(texts))
+    batches = [[]]
+    filled = 0
+    for text in texts:
+        if filled >= target and batches[-1]:
+            batches.append([])
+            filled = 0
+        batches[-1].append(text)
+        filled += len(text) if isinstance(text, str) else 0
+
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *[
+            loop.run_in_executor(getProcessPool(), clean_texts, batch, remove_images)
+            for batch in batches
+        ]
+    )
+    return [text for batch in results for text in batch]
@@ -1,4 +1,5 @@
 import asyncio
+import functools
 from concurrent.futures import ThreadPoolExecutor
 import contextvars
 
@@ -11,4 +12,7 @@ event_loop = contextvars.ContextVar("event_loop")
 
 async def run_in_threadpool(func, *args, **kwargs):
     loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(executor, func, *args, **kwargs)
+    # run_in_executor only passes positional arguments
+    return await loop.run_in_executor(
+        executor, functools.partial(func, *args, **kwargs)
+    )
@@ -0,0 +1,68 @@
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so that trivially different spellings of the same page share one key.
+
+    Lowercases the scheme and host, drops default ports and the fragment, and sorts the
+    query parameters.
+
+    Example:
+        >>> normalize_url("HTTPS://Example.com:443/docs?b=2&a=1#intro")
+        'https://example.com/docs?a=1&b=2'
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"
+
+    netloc = host
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username
+        if parts.password:
+            userinfo += f":{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "yclid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "igshid",
+    "ref_src",
+}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for crawl deduplication.
+
+    On top of normalize_url, drops utm_* and other tracking parameters so that links
+    differing only by fragment or campaign tags are treated as one page.
+
+    Example:
+        >>> canonicalize_url("https://Example.com/a?utm_source=x&id=3#top")
+        'https://example.com/a?id=3'
+    """
+    parts = urlsplit(normalize_url(url))
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query)))
@@ -1,15 +1,17 @@
 import os
-import requests
 import uuid
 from constants import IMAGE_DIR
 from tools.wordcloud.models import WordCloud
 from tools.models import CommandResponse
 from tools.urlBuilder import urlFor, staticURL
+from tools.httpClient import getClient
 
 
-def createWordCloud(data: WordCloud) -> CommandResponse:
+async def createWordCloud(data: WordCloud) -> CommandResponse:
     try:
-        response = requests.post("https://quickchart.io/wordcloud", json=data.dict())
+        response = await getClient().post(
+            "https://quickchart.io/wordcloud", json=data.dict()
+        )
         if response.status_code == 200:
             print("Saving Image")
 
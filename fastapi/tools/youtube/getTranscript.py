@@ -9,7 +9,10 @@ from tools.youtube.models import (
     TranscriptionResponseVideo,
 )
 from typing import List
-from tools.openAI import process_search_results
+import time
+from tools.openAI import process_search_results, stream_summary
+from tools.models import SummarizeMode
+from tools.threadingUtils import run_in_threadpool
 from pytube import Playlist
 import re
 
@@ -79,21 +82,42 @@ def extract_video_ids(url):
     return video_ids, urls
 
 
-def makeSlots(transcription, summarize, entities) -> List[TranscriptionObject]:
-    result: List[TranscriptionObject] = []
+def summaryInput(transcription, summarize_mode=SummarizeMode.abstractive) -> str:
+    if summarize_mode == SummarizeMode.extractive:
+        # One caption per paragraph, as auto-generated captions have no punctuation
+        return "\n\n".join(obj["text"] for obj in transcription)
+    return str(transcription)
+
+
+def summarySlot(transcription, parsed_content) -> TranscriptionObject:
+    for obj in transcription:
+        last_start = obj["start"]
+        last_duration = obj["duration"]
+
+    # Calculate the total duration
+    total_duration = last_start + last_duration
+
+    return TranscriptionObject(text=parsed_content, start=0, duration=total_duration)
 
-    if summarize:
-        parsed_content = process_search_results(None, str(transcription), entities)
-        for obj in transcription:
-            last_start = obj["start"]
-            last_duration = obj["duration"]
 
-        # Calculate the total duration
-        total_duration = last_start + last_duration
+async def makeSlots(
+    transcription,
+    summarize,
+    entities,
+    llm_cache=True,
+    summarize_mode=SummarizeMode.abstractive,
+) -> List[TranscriptionObject]:
+    result: List[TranscriptionObject] = []
 
-        return [
-            TranscriptionObject(text=parsed_content, start=0, duration=total_duration)
-        ]
+    if summarize:
+        parsed_content = await process_search_results(
+            None,
+            summaryInput(transcription, summarize_mode),
+            entities,
+            llm_cache,
+            mode=summarize_mode,
+        )
+        return [summarySlot(transcription, parsed_content)]
 
     text = ""
     dur = 0
@@ -113,34 +137,97 @@ def makeSlots(transcription, summarize, entities) -> List[TranscriptionObject]:
     return result
 
 
-def getTranscription(data: Transcription) -> TranscriptionResponse:
+async def fetchTranscript(videoId, url, data: Transcription, proxy):
+    print(f"Getting transcription for {url}")
+    return await run_in_threadpool(
+        YouTubeTranscriptApi.get_transcript,
+        video_id=videoId,
+        languages=[data.language.value, Language.English_US.value],
+        proxies=proxy,
+    )
+
+
+async def getTranscription(data: Transcription) -> TranscriptionResponse:
 
     proxy_manager = ProxyManager()
-    proxy = proxy_manager.get_proxy()
+    proxy = await run_in_threadpool(proxy_manager.get_proxy)
     response: List[TranscriptionResponseVideo] = []
     responseURLs = []
     for url in data.urls:
         try:
             print(f"Getting Video Ids for {url}")
-            videoIds, videoURL = extract_video_ids(url)
+            videoIds, videoURL = await run_in_threadpool(extract_video_ids, url)
             for videoId, url in zip(videoIds, videoURL):
-                print(f"Getting transcription for {url}")
-                transcription = YouTubeTranscriptApi.get_transcript(
-                    video_id=videoId,
-                    languages=[data.language.value, Language.English_US.value],
-                    proxies=proxy,
-                )
+                transcription = await fetchTranscript(videoId, url, data, proxy)
                 response.append(
                     TranscriptionResponseVideo(
-                        transcript=makeSlots(
-                            transcription, data.summarize, data.entities
+                        transcript=await makeSlots(
+                            transcription,
+                            data.summarize,
+                            data.entities,
+                            data.llm_cache,
+                            data.summarize_mode,
                         )
                     )
                 )
                 responseURLs.append(url)
         except Exception as e:
             print(f"Error getting transcription for {url}: {e}")
-            proxy_manager.remove_and_update_proxy(proxy)
+            await run_in_threadpool(proxy_manager.remove_and_update_proxy, proxy)
             response.append(TranscriptionResponseVideo(transcript=[]))
             continue
     return TranscriptionResponse(urls=responseURLs, transcripts=response)
+
+
+async def streamTranscription(data: Transcription):
+    """
+    Yields a ("result", ...) event per video, then a final ("summary", ...) event with
+    the URLs of the videos.
+
+    While a transcript is summarized, ("progress", ...) and ("token", ...) events
+    carrying the video URL report the summary as it is written.
+    """
+    start = time.monotonic()
+    proxy_manager = ProxyManager()
+    proxy = await run_in_threadpool(proxy_manager.get_proxy)
+    responseURLs = []
+    for url in data.urls:
+        try:
+            print(f"Getting Video Ids for {url}")
+            videoIds, videoURL = await run_in_threadpool(extract_video_ids, url)
+            for videoId, url in zip(videoIds, videoURL):
+                transcription = await fetchTranscript(videoId, url, data, proxy)
+                transcript = None
+                if data.summarize:
+                    async for event, payload in stream_summary(
+                        None,
+                        summaryInput(transcription, data.summarize_mode),
+                        data.entities,
+                        data.llm_cache,
+                        mode=data.summarize_mode,
+                    ):
+                        if event == "result":
+                            transcript = [
+                                summarySlot(transcription, payload["content"])
+                            ]
+                        else:
+                            yield event, {"url": url, **payload}
+                    if transcript is None:
+                        # The summary failed and its error event was sent
+                        continue
+                else:
+                    transcript = await makeSlots(transcription, False, None)
+                responseURLs.append(url)
+                yield "result", {
+                    "url": url,
+                    "transcript": [slot.model_dump() for slot in transcript],
+                }
+        except Exception as e:
+            print(f"Error getting transcription for {url}: {e}")
+            await run_in_threadpool(proxy_manager.remove_and_update_proxy, proxy)
+            yield "error", {"url": url, "detail": str(e)}
+
+    yield "summary", {
+        "urls": responseURLs,
+        "elapsed": round(time.monotonic() - start, 3),
+    }
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
 from enum import Enum
+from tools.entityExtraction import check_entities
+from tools.models import SummarizeMode, StreamFormat
 
 
 class Language(Enum):
@@ -137,6 +139,22 @@ class Transcription(BaseModel):
     urls: List[str]
     summarize: bool = False
     entities: str = None
+    summarize_mode: SummarizeMode = Field(
+        SummarizeMode.abstractive,
+        description="'extractive' picks key sentences locally instead of calling the LLM.",
+    )
+    llm_cache: bool = Field(
+        True, description="Reuse cached LLM responses for identical prompts."
+    )
+    stream: Optional[StreamFormat] = Field(
+        None,
+        description="Stream summary tokens and progress as NDJSON lines or Server-Sent Events.",
+    )
+
+    @field_validator("entities")
+    @classmethod
+    def check_entities(cls, value):
+        return check_entities(value)
 
     class Config:
         json_schema_extra = {